@@ -1,4 +1,5 @@
-from fastapi import FastAPI, HTTPException, Depends, File, UploadFile, Form
+from fastapi import FastAPI, HTTPException, Depends, File, UploadFile, Form, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
 from pydantic import BaseModel
@@ -6,12 +7,21 @@ from typing import Optional, List
 import sqlite3
 import os
 import uuid
-import subprocess
-import sys
+import importlib
 from datetime import datetime
 from io import BytesIO
 import pandas as pd
 from pathlib import Path
+from modules.pipeline import append_days, run_pipeline, RULE_VERSION
+from modules.intermediate import INTERMEDIATE_EXT, export_xlsx
+from modules.jobs import JOB_DONE, JobQueue
+from modules.metrics import StageMetrics
+from modules.result_cache import DayCache, ResultCache, content_key
+from modules.uploads import MultipartFileWriter, UploadError
+from modules.worker_pool import WorkerPool
+
+# 脚本文件名以数字开头，只能通过importlib导入
+split_stage = importlib.import_module("modules.1分割")
 
 app = FastAPI(title="考勤管理系统API", version="1.0.0")
 
@@ -29,6 +39,34 @@ os.makedirs(TEMP_DIR, exist_ok=True)
 os.makedirs("data", exist_ok=True)
 
 processed_files = {}
+# 上传文件信息（文件ID -> 路径、文件名、字节数、SHA-256），哈希用于查找结果缓存
+uploaded_files = {}
+
+# 上传文件时每次交给线程池解析、写入的字节数
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# 上传请求体大小上限（字节）
+MAX_UPLOAD_BYTES = 500 * 1024 * 1024
+
+
+def forget_evicted_result(entry_dir):
+    """结果缓存淘汰结果后，删除仍指向其中文件的文件ID（之后下载时返回"文件不存在"，不再指向已删除的文件）"""
+    entry_dir = os.path.realpath(entry_dir)
+    for file_id, file_path in list(processed_files.items()):
+        if os.path.dirname(os.path.realpath(file_path)) == entry_dir:
+            processed_files.pop(file_id, None)
+
+
+# 相同文件、相同规则版本的处理结果缓存（命中缓存的任务直接下载缓存中的文件）
+result_cache = ResultCache(on_evict=forget_evicted_result)
+# 按天的处理结果缓存，月中重复上传累计的月报时只处理新增或修改过的日期
+day_cache = DayCache()
+
+# 后台处理任务池，每个任务在 TEMP_DIR/jobs/任务ID 下的独立目录中处理，可以并行执行
+JOBS_DIR = os.path.join(TEMP_DIR, "jobs")
+MAX_JOB_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+job_queue = JobQueue(max_workers=MAX_JOB_WORKERS, work_root=JOBS_DIR)
+# 常驻工作进程池（服务启动时启动），所有任务按天拆分后交给其中的进程处理
+worker_pool = WorkerPool(workers=os.cpu_count() or 1)
 
 class LoginRequest(BaseModel):
     username: str
@@ -139,6 +177,12 @@ def get_db():
 @app.on_event("startup")
 async def startup_event():
     init_db()
+    worker_pool.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    job_queue.shutdown()
+    worker_pool.shutdown()
 
 @app.post("/api/auth/login")
 async def login(request: LoginRequest):
@@ -241,48 +285,146 @@ async def update_rules(rules: RulesUpdate):
     return {"message": "规则更新成功"}
 
 @app.post("/api/files/upload")
-async def upload_file(file: UploadFile = File(...)):
+async def upload_file(request: Request):
+    """
+    上传文件（multipart/form-data 的 file 字段）
+    不使用 UploadFile 参数（框架会先把整个请求体缓存到临时文件）：边接收请求体边解析，文件内容直接写入磁盘，
+    同时统计字节数、计算内容哈希；Content-Length 或已接收的字节数超过上限时立即返回413，
+    解析和写入在线程池中执行，不阻塞事件循环
+    """
+    too_large = HTTPException(status_code=413, detail=f"文件超过大小上限 {MAX_UPLOAD_BYTES // (1024 * 1024)}MB")
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > MAX_UPLOAD_BYTES:
+        raise too_large
+
     file_id = str(uuid.uuid4())
-    file_path = os.path.join(TEMP_DIR, f"{file_id}_{file.filename}")
+    try:
+        writer = MultipartFileWriter(request.headers.get("content-type"), os.path.join(TEMP_DIR, file_id))
+    except UploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    received = 0
+    buffer = bytearray()
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > MAX_UPLOAD_BYTES:
+                raise too_large
+            buffer += chunk
+            if len(buffer) >= UPLOAD_CHUNK_SIZE:
+                await run_in_threadpool(writer.write, bytes(buffer))
+                buffer.clear()
+        await run_in_threadpool(writer.write, bytes(buffer))
+        await run_in_threadpool(writer.finish)
+    except UploadError as e:
+        writer.discard()
+        raise HTTPException(status_code=400, detail=str(e))
+    except BaseException:
+        # 未完整写入的文件不保留（包括客户端中途断开）
+        writer.discard()
+        raise
     
-    with open(file_path, "wb") as buffer:
-        content = await file.read()
-        buffer.write(content)
+    uploaded_files[file_id] = {
+        "path": writer.path,
+        "filename": writer.filename,
+        "size": writer.size,
+        "sha256": writer.sha256,
+    }
+    processed_files[file_id] = writer.path
     
-    return {"fileId": file_id, "filename": file.filename}
+    return {"fileId": file_id, "filename": writer.filename, "size": writer.size, "sha256": writer.sha256}
+
+def run_process_job(job, file_path, format, cache_key=None, month=None, filename=None):
+    """在后台任务中执行处理流程（结果及中间文件保存在任务自己的目录中），返回结果文件ID"""
+    job.metrics = StageMetrics()
+    result = run_pipeline(file_path, output_dir=job.work_dir, month=month, pool=worker_pool, day_cache=day_cache,
+                          metrics=job.metrics, source_name=filename)
+
+    final_file = result.output_path
+    if cache_key:
+        result_cache.put(cache_key, RULE_VERSION, final_file)
+    new_file_id = str(uuid.uuid4())
+    processed_files[new_file_id] = final_file
+
+    return {"fileId": new_file_id, "format": format}
 
 @app.post("/api/files/process")
-async def process_excel_file(fileId: str = Form(...), format: str = Form("xlsx")):
+async def process_excel_file(fileId: str = Form(...), format: str = Form("xlsx"), month: Optional[str] = Form(None)):
+    """
+    month: 月报对应的月份（如"2025-09"），不指定时从工作表名称或上传的文件名中识别，
+           都识别不到时日期列为日号（不按当前日期推测月份）
+    """
     if fileId not in processed_files:
         raise HTTPException(status_code=404, detail="文件不存在")
-    
+    period = None
+    if month:
+        period = split_stage.detect_month(month)
+        if period is None:
+            raise HTTPException(status_code=400, detail=f"月份格式不正确: {month}，应为 2025-09 的形式")
+
     file_path = processed_files[fileId]
-    
-    try:
-        scripts = [
-            "modules/1分割.py",
-            "modules/2时间预处理.py",
-            "modules/3分列时间.py",
-            "modules/4全班.py",
-            "modules/66.py",
-            "modules/6.py"
-        ]
-        
-        for script in scripts:
-            result = subprocess.run(
-                [sys.executable, script],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-        
-        final_file = os.path.join(TEMP_DIR, "打卡数据汇总统计.xlsx")
+    upload = uploaded_files.get(fileId, {})
+    filename = upload.get("filename")
+    content_hash = upload.get("sha256")
+    # 工作表名称中没有月份时，结果中的日期取决于指定的月份或文件名中的月份
+    cache_key = None
+    if content_hash:
+        cache_key = content_key(content_hash, period or split_stage.detect_month(filename or ""))
+
+    # 相同内容的文件已在当前规则版本下处理过时，直接返回缓存的结果
+    cached_file = result_cache.get(cache_key, RULE_VERSION) if cache_key else None
+    if cached_file:
         new_file_id = str(uuid.uuid4())
-        processed_files[new_file_id] = final_file
-        
-        return {"status": "success", "fileId": new_file_id, "format": format}
-    except subprocess.CalledProcessError as e:
-        raise HTTPException(status_code=500, detail=f"处理失败: {e.stderr}")
+        processed_files[new_file_id] = cached_file
+        job = job_queue.add_done({"fileId": new_file_id, "format": format, "cached": True})
+    else:
+        job = job_queue.submit(run_process_job, file_path, format, cache_key, period, filename)
+    
+    return {"status": job.status, "jobId": job.id}
+
+def run_append_job(job, base_job, file_path, format):
+    """在后台任务中将补充文件中的日期并入 base_job 的处理结果（合并结果保存在本任务的目录中），返回结果文件ID"""
+    job.metrics = StageMetrics()
+    result = append_days(file_path, base_job.work_dir, output_dir=job.work_dir, pool=worker_pool, day_cache=day_cache,
+                         metrics=job.metrics)
+
+    new_file_id = str(uuid.uuid4())
+    processed_files[new_file_id] = result.output_path
+
+    return {"fileId": new_file_id, "format": format, "baseJobId": base_job.id, "appendedDays": result.day_count}
+
+@app.post("/api/jobs/{job_id}/append")
+async def append_to_job(job_id: str, fileId: str = Form(...), format: str = Form("xlsx")):
+    """将补充导出的部分日期（已上传的文件）并入已完成任务的结果，只处理补充的日期，再重新生成汇总统计"""
+    base_job = job_queue.get(job_id)
+    if base_job is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    if base_job.status != JOB_DONE:
+        raise HTTPException(status_code=409, detail="任务尚未完成")
+    # 直接命中结果缓存的任务没有保存中间结果
+    if base_job.work_dir is None:
+        raise HTTPException(status_code=409, detail="该任务的结果来自缓存，没有可追加的中间结果，请重新处理原始文件")
+    if fileId not in processed_files:
+        raise HTTPException(status_code=404, detail="文件不存在")
+
+    job = job_queue.submit(run_append_job, base_job, processed_files[fileId], format)
+
+    return {"status": job.status, "jobId": job.id}
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    return job.to_dict()
+
+@app.get("/api/jobs/{job_id}/metrics")
+async def get_job_metrics(job_id: str):
+    """任务各阶段的耗时、CPU时间、内存峰值及行数（处理过程中返回已完成的阶段；命中结果缓存的任务没有指标）"""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    metrics = job.metrics.to_dict() if job.metrics else {"stages": [], "peakRssMb": 0}
+    return {"jobId": job.id, "status": job.status, **metrics}
 
 @app.get("/api/files/download/{file_id}")
 async def download_file(file_id: str):
@@ -295,32 +437,41 @@ async def download_file(file_id: str):
     
     return FileResponse(file_path)
 
+def get_temp_path(filename):
+    """临时文件的完整路径（文件名可包含任务子目录），不允许访问临时目录以外的文件"""
+    temp_root = os.path.realpath(TEMP_DIR)
+    file_path = os.path.realpath(os.path.join(temp_root, filename))
+    if os.path.commonpath([temp_root, file_path]) != temp_root or not os.path.isfile(file_path):
+        raise HTTPException(status_code=404, detail="文件不存在")
+    return file_path
+
 @app.get("/api/files/temp")
 async def get_temp_files():
     files = []
-    for filename in os.listdir(TEMP_DIR):
-        file_path = os.path.join(TEMP_DIR, filename)
-        if os.path.isfile(file_path):
+    # 包含各任务目录（jobs/任务ID/）中的文件，名称为相对于临时目录的路径
+    for root, _, filenames in os.walk(TEMP_DIR):
+        for filename in sorted(filenames):
+            file_path = os.path.join(root, filename)
             stat = os.stat(file_path)
             files.append({
-                "name": filename,
+                "name": os.path.relpath(file_path, TEMP_DIR).replace(os.sep, "/"),
                 "size": stat.st_size,
                 "modified": datetime.fromtimestamp(stat.st_mtime).strftime("%Y-%m-%d %H:%M:%S")
             })
     return {"files": files}
 
-@app.get("/api/files/temp/{filename}")
-async def download_temp_file(filename: str):
-    file_path = os.path.join(TEMP_DIR, filename)
-    if not os.path.exists(file_path):
-        raise HTTPException(status_code=404, detail="文件不存在")
+@app.get("/api/files/temp/{filename:path}")
+def download_temp_file(filename: str):
+    file_path = get_temp_path(filename)
+    # 中间结果以Parquet保存，下载时再转换为Excel（整月的工作簿较大，普通函数由FastAPI在线程池中执行，不阻塞其他请求）
+    if filename.endswith(INTERMEDIATE_EXT):
+        file_path = export_xlsx(file_path)
+        return FileResponse(file_path, filename=os.path.basename(file_path))
     return FileResponse(file_path)
 
-@app.delete("/api/files/temp/{filename}")
+@app.delete("/api/files/temp/{filename:path}")
 async def delete_temp_file(filename: str):
-    file_path = os.path.join(TEMP_DIR, filename)
-    if not os.path.exists(file_path):
-        raise HTTPException(status_code=404, detail="文件不存在")
+    file_path = get_temp_path(filename)
     os.remove(file_path)
     return {"message": "删除成功"}
 
@@ -2,22 +2,51 @@ import streamlit as st
 from streamlit.components.v1 import html
 import os
 import json
-import subprocess
 import uuid
 import time
+import hashlib
+import importlib
 from datetime import datetime, timedelta
-from modules import auth, employees, rules, reports
+from modules import auth, employees, rules, reports, excel_reader
+from modules.pipeline import run_pipeline, RULE_VERSION
+from modules.intermediate import INTERMEDIATE_EXT, export_xlsx
+from modules.result_cache import DayCache, ResultCache, content_key
+from modules.worker_pool import WorkerPool
 from io import BytesIO
 import glob
-import sys
+
+# 脚本文件名以数字开头，只能通过importlib导入
+split_stage = importlib.import_module('modules.1分割')
 
 # 确保数据目录和临时目录存在
 os.makedirs('data', exist_ok=True)
 os.makedirs('temp_files', exist_ok=True)
 TEMP_DIR = 'temp_files'
+# 每次处理使用 TEMP_DIR/jobs/处理ID 下的独立目录，多人同时处理时互不覆盖
+JOBS_DIR = os.path.join(TEMP_DIR, 'jobs')
 processed_files = {}  # 存储处理后的文件ID与路径映射
 
 
+@st.cache_resource
+def get_result_caches():
+    """
+    处理结果缓存：相同文件、相同规则版本的处理结果缓存，及按天的处理结果缓存（累计的月报只处理新增或修改过的日期）
+    每个Streamlit服务进程只创建一份，所有会话共用同一把锁（脚本每次重新运行时不再新建）
+    """
+    return ResultCache(), DayCache()
+
+
+@st.cache_resource
+def get_worker_pool():
+    """常驻工作进程池，每个Streamlit服务进程只创建一个，所有会话共用"""
+    return WorkerPool(workers=os.cpu_count() or 1).start()
+
+
+result_cache, day_cache = get_result_caches()
+# 应用启动时即启动工作进程，第一次处理时无需等待进程启动
+worker_pool = get_worker_pool()
+
+
 def init_all_tables():
     """初始化所有数据库表结构"""
     auth.init_users_table()
@@ -60,16 +89,19 @@ def get_backend_data():
 
 
 def clean_temp_files(max_age=3600):
-    """清理过期临时文件（默认1小时）"""
+    """清理过期临时文件（默认1小时），包括各处理目录中的文件及清理后的空目录"""
     now = time.time()
-    for filename in os.listdir(TEMP_DIR):
-        file_path = os.path.join(TEMP_DIR, filename)
-        if os.path.isfile(file_path) and now - os.path.getmtime(file_path) > max_age:
-            os.remove(file_path)
+    for root, dirs, filenames in os.walk(TEMP_DIR, topdown=False):
+        for filename in filenames:
+            file_path = os.path.join(root, filename)
+            if now - os.path.getmtime(file_path) > max_age:
+                os.remove(file_path)
+        if os.path.abspath(root) != os.path.abspath(TEMP_DIR) and not os.listdir(root):
+            os.rmdir(root)
 
 
 def process_excel_file(output_format="xlsx"):
-    """处理已上传的Excel文件"""
+    """处理已上传的Excel文件（月份取侧边栏中填写的月份，未填写时从工作表名称或上传的文件名中识别）"""
     if not st.session_state.get("uploaded_file"):
         return {"status": "error", "error": "未找到上传的文件"}
 
@@ -81,55 +113,47 @@ def process_excel_file(output_format="xlsx"):
         # with open(original_path, "wb") as f:
         #     f.write(st.session_state["uploaded_file"].getbuffer())
         # 保存上传的文件（根据原始格式保存）
+        file_id = str(uuid.uuid4())
+        run_dir = os.path.join(JOBS_DIR, file_id)
+        os.makedirs(run_dir, exist_ok=True)
         file_ext = os.path.splitext(st.session_state["uploaded_file"].name)[1].lower()
-        original_path = os.path.join(TEMP_DIR, f"原始文件{file_ext}")
+        original_path = os.path.join(run_dir, f"原始文件{file_ext}")
         with open(original_path, "wb") as f:
             f.write(st.session_state["uploaded_file"].getbuffer())
-        if file_ext in ['.xlsx', '.xls']:
-            scripts = [
-                "1分割.py", "2时间预处理.py", 
-                "3分列时间.py", "4全班.py","66.py", "6.py"
-            ]
-        elif file_ext == '.csv':
-            scripts = [
-                "1_csv分割.py", "2_csv处理.py",  # 假设的CSV处理脚本
-                "3_csv汇总.py"
-            ]
-        else:
+        if file_ext not in ['.xlsx', '.xls']:
             raise Exception(f"不支持的文件格式: {file_ext}")
-        # 执行处理脚本
-        # scripts = [
-        #     "1分割.py", "2时间预处理.py", 
-        #     "3分列时间.py", "4全班.py", "5汇总.py"
-        # ]
-        
-        for script in scripts:
-            result = subprocess.run(
-                [sys.executable, os.path.join("modules", script)],  # 使用当前环境的Python
-                check=True,
-                capture_output=True,
-                text=True
-            )
-            # 输出脚本执行日志（调试用）
-            print(f"脚本 {script} 执行结果: {result.stdout}")
+        month_text = st.session_state.get("report_month", "").strip()
+        month = split_stage.detect_month(month_text) if month_text else None
+        if month_text and month is None:
+            raise Exception(f"月份格式不正确: {month_text}，应为 2025-09 的形式")
+        uploaded_name = st.session_state["uploaded_file"].name
+
+        # 相同内容的文件已在当前规则版本下处理过时直接使用缓存的结果，
+        # 否则在当前进程内执行处理流程（1分割 → 2时间预处理 → 3分列时间 → 4全班 → 66 → 6）
+        # （工作表名称中没有月份时，结果中的日期取决于填写的月份或文件名中的月份，一并作为缓存的键）
+        content_hash = hashlib.sha256(st.session_state["uploaded_file"].getbuffer()).hexdigest()
+        cache_key = content_key(content_hash, month or split_stage.detect_month(uploaded_name))
+        summary_path = result_cache.get(cache_key, RULE_VERSION)
+        if summary_path is None:
+            summary_path = run_pipeline(original_path, output_dir=run_dir, month=month, pool=worker_pool,
+                                        day_cache=day_cache, source_name=uploaded_name).output_path
+            result_cache.put(cache_key, RULE_VERSION, summary_path)
 
         # # 生成文件ID并存储路径
         # file_id = str(uuid.uuid4())
         # final_file_path = os.path.join(TEMP_DIR, "打卡数据汇总统计.xlsx")
         # processed_files[file_id] = final_file_path
         # 根据输出格式生成文件
-        file_id = str(uuid.uuid4())
         if output_format == 'csv':
-            final_file_path = os.path.join(TEMP_DIR, "打卡数据汇总统计.csv")
+            final_file_path = os.path.join(run_dir, "打卡数据汇总统计.csv")
             # 如果原处理结果是Excel，这里可以添加转换为CSV的代码
             # 例如使用pandas将xlsx转换为csv
-            import pandas as pd
-            excel_path = os.path.join(TEMP_DIR, "打卡数据汇总统计.xlsx")
+            excel_path = summary_path
             if os.path.exists(excel_path):
-                df = pd.read_excel(excel_path)
+                df = excel_reader.read_sheet(excel_path)
                 df.to_csv(final_file_path, index=False, encoding='utf-8-sig')
         else:
-            final_file_path = os.path.join(TEMP_DIR, "打卡数据汇总统计.xlsx")
+            final_file_path = summary_path
         
         processed_files[file_id] = final_file_path
 
@@ -139,9 +163,6 @@ def process_excel_file(output_format="xlsx"):
         clean_temp_files()  # 清理过期文件
         return {"status": "success", "file_id": file_id, "format": output_format}
 
-    except subprocess.CalledProcessError as e:
-        st.session_state["processing"] = False
-        return {"status": "error", "error": f"脚本执行错误: {e.stderr}"}
     except Exception as e:
         st.session_state["processing"] = False
         return {"status": "error", "error": str(e)}
@@ -159,9 +180,9 @@ def get_processed_file(file_id):
 
 # 新增函数：获取temp_files目录中的所有文件
 def get_temp_files():
-    """获取临时目录中的所有文件列表"""
-    files = glob.glob(os.path.join(TEMP_DIR, '*'))
-    return [os.path.basename(file) for file in files if os.path.isfile(file)]
+    """获取临时目录（含各处理目录）中的所有文件列表，返回相对于临时目录的路径"""
+    files = glob.glob(os.path.join(TEMP_DIR, '**', '*'), recursive=True)
+    return [os.path.relpath(file, TEMP_DIR) for file in files if os.path.isfile(file)]
 
 # 新增函数：下载指定的临时文件
 def download_temp_file(filename):
@@ -170,6 +191,11 @@ def download_temp_file(filename):
     if not os.path.exists(file_path) or not os.path.isfile(file_path):
         return None
     
+    # 中间结果以Parquet保存，下载时再转换为Excel
+    if filename.endswith(INTERMEDIATE_EXT):
+        file_path = export_xlsx(file_path)
+        filename = os.path.basename(file_path)
+    
     # 根据文件扩展名确定MIME类型
     if filename.endswith('.xlsx'):
         mime = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
@@ -181,7 +207,7 @@ def download_temp_file(filename):
         mime = "application/octet-stream"
     
     with open(file_path, "rb") as f:
-        return BytesIO(f.read()), mime
+        return BytesIO(f.read()), mime, os.path.basename(filename)
 
 def main():
     st.set_page_config(
@@ -249,6 +275,8 @@ def main():
             key="file_uploader",
             on_change=handle_file_upload
         )
+        # 月报月份（工作表名称、文件名中都没有月份时填写，否则日期列只有日号）
+        st.text_input("月报月份（如 2025-09，可不填）", key="report_month")
         
         # 处理按钮（仅在有文件且未处理时可用）
         st.button(
@@ -278,12 +306,12 @@ def main():
         temp_files = get_temp_files()
         if temp_files:
             selected_file = st.selectbox("选择要下载的文件", temp_files)
-            file_data, mime = download_temp_file(selected_file)
+            file_data, mime, download_name = download_temp_file(selected_file)
             if file_data:
                 st.download_button(
                     label=f"下载 {selected_file}",
                     data=file_data,
-                    file_name=selected_file,
+                    file_name=download_name,
                     mime=mime,
                     key=f"temp_file_{selected_file}"
                 )
@@ -77,8 +77,20 @@ export const fileApi = {
       headers: { 'Content-Type': 'multipart/form-data' }
     })
   },
-  processExcel(fileId, format = 'xlsx') {
-    return request.post('/files/process', { fileId, format })
+  processExcel(fileId, format = 'xlsx', month = '') {
+    const formData = new FormData()
+    formData.append('fileId', fileId)
+    formData.append('format', format)
+    // 月报月份（如 2025-09），不传时由服务端从工作表名称或文件名中识别
+    if (month) {
+      formData.append('month', month)
+    }
+    return request.post('/files/process', formData, {
+      headers: { 'Content-Type': 'multipart/form-data' }
+    })
+  },
+  getJob(jobId) {
+    return request.get(`/jobs/${jobId}`)
   },
   downloadProcessedFile(fileId) {
     return request.get(`/files/download/${fileId}`, { responseType: 'blob' })
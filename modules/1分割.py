@@ -1,45 +1,121 @@
+import re
+import sys
+
+import numpy as np
 import pandas as pd
 import os
 
-# 读取Excel文件
-current_dir = os.path.dirname(os.path.abspath(__file__))
-file_path = os.path.join(current_dir, '../temp_files/原始文件.xlsx')
-xls = pd.ExcelFile(file_path)
-
-# 获取第一个工作表的名称作为tm值
-first_sheet_name = xls.sheet_names[0]  # 获取第一个工作表的名称
-tm = first_sheet_name  # 将工作表名称赋值给tm
-print(f"获取到的工作表前缀（第一个工作表名称）: {tm}")
-
-# 读取第一个工作表的主要数据
-df = pd.read_excel(xls, sheet_name=first_sheet_name)
-
-# 创建一个新的Excel写入器
-output_file = os.path.join(current_dir, '../temp_files/按日期分表的打卡数据.xlsx')
-with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-    # 首先写入原始数据作为第一个工作表（如果原始数据中有班次列也会被保留，这里只处理分割部分）
-    df.to_excel(writer, sheet_name='原始数据', index=False)
-    # 统计有效日期列的数量
-    valid_days = 0
-
-    # 循环处理每一天（1到31）
-    for day in range(1, 100):
-        # 检查该日期列是否存在（列名是数字类型）
-        if day in df.columns:
-            # 选择需要的列（移除了'班次'列）
-            selected_columns = ['姓名', '员工ID', '部门', day]
-            # 复制选定的列到新的DataFrame
-            day_df = df[selected_columns].copy()
-            # 将日期列重命名为'打卡时间'
-            day_df.rename(columns={day: '打卡时间'}, inplace=True)
-
-            if not day_df.empty:
-                # 使用第一个工作表名称作为前缀创建工作表名称（例如：2025年7月1日）
-                sheet_name = f'{tm}{day}日'
-                day_df.to_excel(writer, sheet_name=sheet_name, index=False)
-                valid_days += 1
-                print(f"已创建 {sheet_name} 工作表，包含 {len(day_df)} 条记录")
-
-    print(f"\n总计创建了 {valid_days} 个日期工作表")
-
-print(f"\n已成功将数据按日期拆分到 {output_file} 中的多个工作表")
\ No newline at end of file
+# 直接运行本脚本时，将项目根目录加入搜索路径以便导入 modules 包
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from modules import excel_export, excel_reader
+
+
+# 员工信息列（转换为分类类型）
+EMPLOYEE_COLS = ['姓名', '员工ID', '部门']
+# 长表的列顺序
+LONG_COLS = ['日期'] + EMPLOYEE_COLS + ['打卡时间']
+# 没有月份时日期列保存日号（1～31）的类型
+DAY_DTYPE = np.int8
+
+
+def detect_month(text):
+    """从工作表名称或文件名中识别年月（如"2025年9月"、"2025-09"），识别不到时返回None"""
+    # 年月前后不能紧接字母或数字，避免误识别文件ID（uuid）中的数字
+    match = re.search(r'(?<![0-9A-Za-z])(20\d{2})\s*[年\-_/.]\s*(\d{1,2})(?![0-9A-Za-z])', str(text))
+    if match and 1 <= int(match.group(2)) <= 12:
+        return pd.Period(year=int(match.group(1)), month=int(match.group(2)), freq='M')
+    return None
+
+
+def resolve_month(month=None):
+    """
+    将指定的月份（pd.Period 或 "2025-09" 形式的字符串）转换为 pd.Period，未指定时返回None
+    （不按当前日期推测月份：月初重新处理上个月的月报时会得到错误的日期，结果也随处理的日期变化）
+    """
+    if month is None:
+        return None
+    return pd.Period(month, freq='M')
+
+
+def normalize_chunks(chunks, tm, month=None):
+    """
+    将月度打卡矩阵（每天一列）转换为长表，每行为一名员工一天的打卡记录
+    chunks: 按员工分段读取的打卡矩阵（DataFrame的可迭代对象）
+    month: 月报对应的月份，为None时从工作表名称 tm 中识别
+    返回列：日期（有月份时为日期类型，识别不到月份时为日号 1～31）、姓名、员工ID、部门（分类类型）、
+    打卡时间（原始打卡字符串）
+    行按日期、再按原表员工顺序排列（与 DataFrame.melt 的结果相同）
+    """
+    if month is None:
+        month = detect_month(tm)
+
+    # 每段只保留员工信息列和日期列，读取的原始行随即释放
+    employee_parts = []
+    punch_parts = []
+    day_cols = None
+    for chunk in chunks:
+        if day_cols is None:
+            # 日期列的列名是数字类型（1到31），由表头决定，各段相同
+            day_cols = [day for day in range(1, 32) if day in chunk.columns]
+        employee_parts.append(chunk[EMPLOYEE_COLS])
+        punch_parts.append(chunk[day_cols])
+    employees = pd.concat(employee_parts, ignore_index=True)
+    punches = pd.concat(punch_parts, ignore_index=True)
+    period = resolve_month(month)
+    if period is not None and day_cols and day_cols[-1] > period.days_in_month:
+        # 月报模板固定有31列：超出该月天数的空列直接去掉，有打卡记录则说明月份不对，不能顺延到下个月
+        extra_cols = [day for day in day_cols if day > period.days_in_month]
+        if punches[extra_cols].map(lambda v: pd.notna(v) and str(v).strip() != '').any(axis=None):
+            raise ValueError(f"{period} 只有 {period.days_in_month} 天，但第 {extra_cols[0]} 日及以后有打卡记录，请检查月份")
+        day_cols = [day for day in day_cols if day <= period.days_in_month]
+        punches = punches[day_cols]
+    if period is None:
+        dates = np.array(day_cols, dtype=DAY_DTYPE)
+    else:
+        dates = period.start_time + pd.to_timedelta([day - 1 for day in day_cols], unit='D')
+
+    # 员工信息每天重复一遍：只重复分类编码，不复制字符串
+    employee_count = len(employees)
+    long_df = pd.DataFrame({'日期': np.repeat(dates, employee_count)})
+    for col in EMPLOYEE_COLS:
+        categories = employees[col].astype('category')
+        long_df[col] = pd.Categorical.from_codes(
+            np.tile(categories.cat.codes.to_numpy(), len(day_cols)), dtype=categories.dtype
+        )
+    # 按列展开（先第1天的所有员工，再第2天……）
+    long_df['打卡时间'] = punches.to_numpy().ravel(order='F')
+
+    month_text = "未识别到月份（日期列为日号）" if period is None else f"获取到的月份: {period}"
+    print(f"{month_text}，共 {len(day_cols)} 天、{employee_count} 名员工、{len(long_df)} 条记录")
+    return long_df
+
+
+def normalize(df, tm, month=None):
+    """将已完整读入的月度打卡矩阵转换为长表（见 normalize_chunks）"""
+    return normalize_chunks([df], tm, month)
+
+
+def read_original_chunks(file_path, chunk_rows=excel_reader.CHUNK_ROWS):
+    """
+    以只读方式流式读取原始文件第一个工作表
+    返回 (工作表前缀tm, 按员工分段的DataFrame迭代器)，每段最多 chunk_rows 名员工
+    """
+    # 获取第一个工作表的名称作为tm值
+    tm = excel_reader.first_sheet_name(file_path)
+    print(f"获取到的工作表前缀（第一个工作表名称）: {tm}")
+    return tm, excel_reader.iter_chunks(file_path, tm, chunk_rows)
+
+
+if __name__ == "__main__":
+    # 输入、输出文件路径可通过命令行参数指定：python 1分割.py [输入文件] [输出文件]
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    file_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(current_dir, '../temp_files/原始文件.xlsx')
+    output_file = sys.argv[2] if len(sys.argv) > 2 else os.path.join(current_dir, '../temp_files/按日期分表的打卡数据.xlsx')
+    tm, chunks = read_original_chunks(file_path)
+    long_df = normalize_chunks(chunks, tm)
+
+    # 长表写入一个工作表，工作表名称沿用原始工作表名称（6.py 按 "{工作表名称}{日}日" 生成每日统计）
+    excel_export.write_sheets(output_file, {tm: long_df})
+
+    print(f"\n已成功将数据整理为长表，保存到 {output_file}")
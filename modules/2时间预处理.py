@@ -1,6 +1,20 @@
+import numpy as np
 import pandas as pd
-from datetime import datetime
 import os
+import sys
+
+# 直接运行本脚本时，将项目根目录加入搜索路径以便导入 modules 包
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from modules import excel_export, excel_reader, time_parse
+
+# 时间界限（零点起的分钟数），与 process_checkin_time 中的 12:00 / 17:30 一致
+NOON_MINUTES = 12 * 60
+END_LIMIT_MINUTES = 17 * 60 + 30
+# 超过该次数的打卡记录才需要精简
+MAX_PUNCHES = 4
+# 0~1439 分钟对应的 HH:MM 字符串
+_MINUTE_TEXT = np.array([f"{m // 60:02d}:{m % 60:02d}" for m in range(24 * 60)], dtype=object)
 
 
 def process_checkin_time(time_str):
@@ -16,22 +30,21 @@ def process_checkin_time(time_str):
     if len(times) <= 4:
         return time_str
 
-    # 转换为datetime对象便于比较
-    try:
-        time_objs = [datetime.strptime(t, '%H:%M') for t in times]
-    except ValueError:
+    # 转换为分钟数便于比较
+    time_objs = [time_parse.parse_hhmm(t) for t in times]
+    if time_parse.MISSING in time_objs:
         return time_str  # 格式错误时返回原始值
 
     # 获取第一次打卡时间，判断是否需要处理
     first_checkin = min(time_objs)  # 最早的打卡时间
-    noon = datetime.strptime('12:00', '%H:%M')
+    noon = NOON_MINUTES
 
     # 如果第一次打卡时间大于12:00，不处理
     if first_checkin > noon:
         return time_str
 
     # 定义时间界限
-    end_limit = datetime.strptime('17:30', '%H:%M')
+    end_limit = END_LIMIT_MINUTES
 
     # 分类时间
     before_noon = [t for t in time_objs if t < noon]
@@ -53,33 +66,121 @@ def process_checkin_time(time_str):
         result.append(max(after))
 
     # 转换回字符串格式
-    return ';'.join([t.strftime('%H:%M') for t in result])
+    return ';'.join([_MINUTE_TEXT[t] for t in result])
+
+
+def reduce_punches(series):
+    """
+    按 process_checkin_time 的规则批量精简一列打卡时间，只返回需要精简的行
+    先把打卡字符串展开为 (行, 分钟数) 长表，按 12:00前 / 12:00~17:30 / 17:30后 三个时段
+    分组求最早、最晚时间
+    返回 (行位置数组, 四个字符串数组)：依次为12:00前最后一次、12:00~17:30第一次、12:00~17:30最后一次、
+    17:30后最后一次打卡的 HH:MM 字符串，该时段没有保留的打卡时为空字符串
+    """
+    empty = (np.array([], dtype=np.intp), [np.array([], dtype=object)] * MAX_PUNCHES)
+    if series.empty:
+        return empty
+
+    # 展开为每个打卡时间一行，行号为原Series中的位置
+    tokens = series.astype(str).str.split(';').explode().str.strip()
+    rows = np.repeat(np.arange(len(series)), series.astype(str).str.count(';').to_numpy() + 1)
+    valid = (tokens != '').to_numpy()
+    tokens = tokens.to_numpy()[valid]
+    rows = rows[valid]
+
+    # 打卡次数不超过4次的行不处理
+    counts = np.bincount(rows, minlength=len(series))
+    keep = counts[rows] > MAX_PUNCHES
+    tokens = tokens[keep]
+    rows = rows[keep]
+    if len(rows) == 0:
+        return empty
+
+    # 每个不同的时间字符串只解析一次，无法解析时为-1
+    minutes = time_parse.parse_series(tokens, time_parse.parse_hhmm)
+
+    long_df = pd.DataFrame({
+        'row': rows,
+        'window': np.select([minutes < NOON_MINUTES, minutes <= END_LIMIT_MINUTES], [0, 1], 2),
+        'minute': minutes,
+    })
+    # 含无法解析的时间、或第一次打卡晚于12:00的行保持原值
+    per_row = long_df.groupby('row')['minute'].agg(['min', 'max'])
+    per_row = per_row[(per_row['min'] >= 0) & (per_row['min'] <= NOON_MINUTES)]
+    if per_row.empty:
+        return empty
+    long_df = long_df[long_df['row'].isin(per_row.index)]
+
+    # 各时段的最早、最晚时间及打卡次数
+    stats = long_df.groupby(['row', 'window'])['minute'].agg(['min', 'max', 'count']).unstack('window')
+    stats = stats.reindex(columns=pd.MultiIndex.from_product([['min', 'max', 'count'], [0, 1, 2]]))
+    count = stats['count'].fillna(0).to_numpy()
+    first = stats['min'].fillna(0).to_numpy(dtype=np.int32)
+    last = stats['max'].fillna(0).to_numpy(dtype=np.int32)
+
+    # 12:00前保留最后一个；12:00~17:30保留第一个和最后一个；17:30后保留最后一个
+    parts = [
+        np.where(count[:, 0] > 0, _MINUTE_TEXT[last[:, 0]], ''),
+        np.where(count[:, 1] > 0, _MINUTE_TEXT[first[:, 1]], ''),
+        np.where(count[:, 1] > 1, _MINUTE_TEXT[last[:, 1]], ''),
+        np.where(count[:, 2] > 0, _MINUTE_TEXT[last[:, 2]], ''),
+    ]
+    return stats.index.to_numpy(), parts
+
+
+def pack_punches(parts):
+    """将 reduce_punches 返回的各时段打卡时间依次用";"连接（跳过空字符串），返回字符串数组"""
+    packed = pd.Series(parts[0], dtype=object)
+    for part in parts[1:]:
+        part = pd.Series(part, dtype=object)
+        packed = packed.where(part == '', packed.where(packed == '', packed + ';') + part)
+    return packed.to_numpy()
+
+
+def process_checkin_times(series):
+    """批量处理一列打卡时间，结果与逐个调用 process_checkin_time 相同；不需要处理的行保持原值"""
+    result = series.copy()
+    rows, parts = reduce_punches(series)
+    if len(rows):
+        result.iloc[rows] = pack_punches(parts)
+    return result
+
+
+def process_sheet(df, vectorized=True):
+    """
+    处理单个工作表的打卡时间列，返回处理后的DataFrame
+    vectorized: 为False时逐个调用 process_checkin_time，用于核对批量处理的结果
+    """
+    # 检查是否存在"打卡时间"列
+    if '打卡时间' in df.columns:
+        # 处理所有打卡时间（根据第一次打卡时间自动判断是否需要处理）
+        mask = (df['打卡时间'].notna()) & (df['打卡时间'].astype(str).str.strip() != '')
+        if vectorized:
+            df.loc[mask, '打卡时间'] = process_checkin_times(df.loc[mask, '打卡时间'])
+        else:
+            df.loc[mask, '打卡时间'] = df.loc[mask, '打卡时间'].apply(process_checkin_time)
+    return df
 
 
 def process_excel_file(file_path, output_path):
     """处理Excel文件，忽略原始数据工作表"""
     # 读取所有工作表
-    xls = pd.ExcelFile(file_path)
-    sheet_names = xls.sheet_names
-
-    # 创建ExcelWriter用于写入结果
-    with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-        for sheet in sheet_names:
-            # 跳过原始数据工作表
-            if sheet == '原始数据':
-                continue
+    sheet_names = excel_reader.sheet_names(file_path)
 
-            # 读取工作表数据
-            df = pd.read_excel(xls, sheet_name=sheet)
+    # 创建工作簿用于写入结果（逐个工作表写入磁盘）
+    wb = excel_export.new_workbook()
+    for sheet in sheet_names:
+        # 跳过原始数据工作表
+        if sheet == '原始数据':
+            continue
 
-            # 检查是否存在"打卡时间"列
-            if '打卡时间' in df.columns:
-                # 处理所有打卡时间（根据第一次打卡时间自动判断是否需要处理）
-                mask = (df['打卡时间'].notna()) & (df['打卡时间'].astype(str).str.strip() != '')
-                df.loc[mask, '打卡时间'] = df.loc[mask, '打卡时间'].apply(process_checkin_time)
+        # 读取工作表数据
+        df = excel_reader.read_sheet(file_path, sheet)
+        df = process_sheet(df)
 
-            # 写入处理后的工作表
-            df.to_excel(writer, sheet_name=sheet, index=False)
+        # 写入处理后的工作表
+        excel_export.write_sheet(wb, sheet, df)
+    wb.save(output_path)
 
     print(f"处理完成，结果已保存至: {output_path}")
 
@@ -88,6 +189,6 @@ def process_excel_file(file_path, output_path):
 if __name__ == "__main__":
     # 读取Excel文件
     current_dir = os.path.dirname(os.path.abspath(__file__))
-    input_file = os.path.join(current_dir, '../temp_files/按日期分表的打卡数据.xlsx')
-    output_file = os.path.join(current_dir, '../temp_files/按日期分表的处理打卡数据.xlsx')
+    input_file = sys.argv[1] if len(sys.argv) > 1 else os.path.join(current_dir, '../temp_files/按日期分表的打卡数据.xlsx')
+    output_file = sys.argv[2] if len(sys.argv) > 2 else os.path.join(current_dir, '../temp_files/按日期分表的处理打卡数据.xlsx')
     process_excel_file(input_file, output_file)
\ No newline at end of file
@@ -1,111 +1,147 @@
+import numpy as np
 import pandas as pd
-import openpyxl
-from openpyxl.utils.dataframe import dataframe_to_rows
 import os
-from datetime import datetime
-
-current_dir = os.path.dirname(os.path.abspath(__file__))
-input_file = os.path.join(current_dir, '../temp_files/按日期分表的处理打卡数据.xlsx')
-output_file = os.path.join(current_dir, '../temp_files/按打卡时间分列的打卡数据.xlsx')
-
-# 加载工作簿
-wb = openpyxl.load_workbook(input_file)
-# 创建新工作簿用于保存处理后的数据
-new_wb = openpyxl.Workbook()
-# 移除默认创建的工作表
-default_sheet = new_wb.active
-new_wb.remove(default_sheet)
-
-# 复制"原始数据"工作表到新工作簿
-if '原始数据' in wb.sheetnames:
-    original_sheet = wb['原始数据']
-    new_ws = new_wb.create_sheet(title='原始数据')
-    for row in original_sheet.iter_rows(values_only=True):
-        new_ws.append(row)
-
-# 处理其他工作表
-processed_sheets = 0
-for sheet_name in wb.sheetnames:
-    # 跳过"原始数据"工作表
-    if sheet_name == '原始数据':
-        continue
-
-    # 读取当前工作表数据
-    df = pd.read_excel(input_file, sheet_name=sheet_name)
+import sys
+
+# 直接运行本脚本时，将项目根目录加入搜索路径以便导入 modules 包
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from modules import excel_export, excel_reader, time_parse
+
+# 拆分后的四次打卡列
+PUNCH_COLS = ['第一次打卡', '第二次打卡', '第三次打卡', '第四次打卡']
+# 班次界限（零点起的分钟数），与 determine_shift 中的 12:00 / 17:00 / 23:59 一致
+NOON_MINUTES = 12 * 60
+FIVE_PM_MINUTES = 17 * 60
+LATE_LIMIT_MINUTES = 23 * 60 + 59
+# 班次为空的部门
+NO_SHIFT_DEPT = '后勤部'
+
+
+# 新增：添加班次列
+def determine_shift(row):
+    # 后勤部班次为空
+    if row.get('部门') == '后勤部':
+        return ''
+
+    first_punch = row.get('第一次打卡')
+    if not first_punch:
+        return ''
+
+    # 解析时间（分钟数）
+    punch_time = time_parse.parse_hhmm(first_punch)
+    # 时间格式错误时返回空
+    if punch_time == time_parse.MISSING:
+        return ''
+
+    # 判断班次
+    if punch_time < NOON_MINUTES:
+        return '早班'
+    elif NOON_MINUTES <= punch_time < FIVE_PM_MINUTES:
+        return '中班'
+    elif FIVE_PM_MINUTES <= punch_time < LATE_LIMIT_MINUTES:
+        return '晚班'
+    else:
+        return ''
+
+
+def infer_shifts(df, vectorized=True):
+    """
+    按第一次打卡时间推断每行的班次，返回Series（规则见 determine_shift）
+    第一次打卡的分钟数按 12:00 / 17:00 / 23:59 分段，后勤部的行按部门筛选后置为空
+    vectorized: 为False时逐行调用 determine_shift，用于核对批量处理的结果
+    """
+    if not vectorized:
+        return df.apply(determine_shift, axis=1)
+
+    if '第一次打卡' in df.columns:
+        # 每个不同的时间字符串只解析一次，空值或无法解析时为-1
+        minutes = time_parse.parse_series(df['第一次打卡'], time_parse.parse_hhmm)
+    else:
+        minutes = np.full(len(df), -1, dtype=np.int32)
+    shifts = np.select(
+        [minutes < 0, minutes < NOON_MINUTES, minutes < FIVE_PM_MINUTES, minutes < LATE_LIMIT_MINUTES],
+        ['', '早班', '中班', '晚班'],
+        '',
+    ).astype(object)
+    if '部门' in df.columns:
+        shifts[(df['部门'] == NO_SHIFT_DEPT).to_numpy()] = ''
+    return pd.Series(shifts, index=df.index, dtype=object)
+
+
+def split_punches(series):
+    """
+    将一列打卡时间按";"拆分为第一次到第四次打卡四列（去除首尾空白），返回DataFrame
+    超过4次时多余的打卡留在第四次打卡中；空值及不足4次时缺少的列与原来写入Excel前一样为字符串
+    """
+    # 最多拆分为4列（第一次到第四次打卡）
+    punch_times = series.astype(str).str.split(';', expand=True, n=3)
+    # 确保有4列；整列缺失时与部分缺失一样填None，结果不受同表其他行打卡次数的影响
+    for i in range(punch_times.shape[1], 4):
+        punch_times[i] = None
+    punch_times.columns = PUNCH_COLS
+
+    # 确保时间格式正确（去除可能的空字符）
+    for col in PUNCH_COLS:
+        punch_times[col] = punch_times[col].astype(str).str.strip()
+    return punch_times
+
+
+def join_punch_columns(df, punch_times, shifts):
+    """用拆分后的四次打卡替换"打卡时间"列，班次列放在第一次打卡前面"""
+    result_df = df.drop(columns=['打卡时间'])
+    result_df['班次'] = shifts
+    return result_df.join(punch_times)
 
+
+def split_punch_columns(df):
+    """将"打卡时间"列按";"拆分为第一次到第四次打卡并推断班次，缺少该列时返回None"""
     # 检查是否包含"打卡时间"列
     if '打卡时间' not in df.columns:
-        print(f"警告：工作表 '{sheet_name}' 中未找到 '打卡时间' 列，已跳过")
-        continue
+        return None
 
     # 处理打卡时间列，按";"拆分
-    # 最多拆分为4列（第一次到第四次打卡）
-    punch_times = df['打卡时间'].astype(str).str.split(';', expand=True, n=3)
-    punch_times = punch_times.reindex(columns=range(4))  # 确保有4列
-    punch_times.columns = ['第一次打卡', '第二次打卡', '第三次打卡', '第四次打卡']
-
-    # 合并原始数据和拆分后的打卡时间
-    # 先删除原始的"打卡时间"列，再合并
-    result_df = df.drop(columns=['打卡时间']).join(punch_times)
-
-    # 确保时间格式正确（去除可能的空字符）
-    for col in ['第一次打卡', '第二次打卡', '第三次打卡', '第四次打卡']:
-        if col in result_df.columns:
-            result_df[col] = result_df[col].astype(str).str.strip()
-
-
-    # 新增：添加班次列
-    def determine_shift(row):
-        # 后勤部班次为空
-        if row.get('部门') == '后勤部':
-            return ''
-
-        first_punch = row.get('第一次打卡')
-        if not first_punch:
-            return ''
-
-        try:
-            # 解析时间
-            punch_time = datetime.strptime(first_punch, '%H:%M').time()
-            # 定义时间界限
-            noon = datetime.strptime('12:00', '%H:%M').time()
-            five_pm = datetime.strptime('17:00', '%H:%M').time()
-            ten_pm = datetime.strptime('23:59', '%H:%M').time()
-
-            # 判断班次
-            if punch_time < noon:
-                return '早班'
-            elif noon <= punch_time < five_pm:
-                return '中班'
-            elif five_pm <= punch_time < ten_pm:
-                return '晚班'
-            else:
-                return ''
-        except:
-            # 时间格式错误时返回空
-            return ''
-
-
-    # 应用函数计算班次
-    result_df['班次'] = result_df.apply(determine_shift, axis=1)
-
-    # 调整列顺序：将班次列移到第一次打卡列前面
-    cols = result_df.columns.tolist()
-    # 找到第一次打卡的索引位置
-    first_punch_idx = cols.index('第一次打卡')
-    # 移除班次列并插入到第一次打卡前面
-    cols.remove('班次')
-    cols.insert(first_punch_idx, '班次')
-    result_df = result_df[cols]
-
-    # 创建新工作表并写入处理后的数据
-    new_ws = new_wb.create_sheet(title=sheet_name)
-    for r in dataframe_to_rows(result_df, index=False, header=True):
-        new_ws.append(r)
-
-    processed_sheets += 1
-    print(f"已处理工作表：{sheet_name}，拆分了 {len(result_df)} 条打卡记录")
-
-# 保存处理后的文件
-new_wb.save(output_file)
-print(f"\n处理完成！共处理 {processed_sheets} 个工作表，结果已保存到 {output_file}")
\ No newline at end of file
+    punch_times = split_punches(df['打卡时间'])
+    # 应用函数计算班次（需要部门和第一次打卡）
+    shifts = infer_shifts(df[['部门']].join(punch_times[['第一次打卡']]) if '部门' in df.columns
+                          else punch_times[['第一次打卡']])
+    return join_punch_columns(df, punch_times, shifts)
+
+
+if __name__ == "__main__":
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    input_file = sys.argv[1] if len(sys.argv) > 1 else os.path.join(current_dir, '../temp_files/按日期分表的处理打卡数据.xlsx')
+    output_file = sys.argv[2] if len(sys.argv) > 2 else os.path.join(current_dir, '../temp_files/按打卡时间分列的打卡数据.xlsx')
+
+    # 加载工作簿
+    sheet_names = excel_reader.sheet_names(input_file)
+    # 创建新工作簿用于保存处理后的数据（逐个工作表写入磁盘）
+    new_wb = excel_export.new_workbook()
+
+    # 复制"原始数据"工作表到新工作簿
+    if '原始数据' in sheet_names:
+        excel_export.write_sheet(new_wb, '原始数据', excel_reader.read_sheet(input_file, '原始数据'))
+
+    # 处理其他工作表
+    processed_sheets = 0
+    for sheet_name in sheet_names:
+        # 跳过"原始数据"工作表
+        if sheet_name == '原始数据':
+            continue
+
+        # 读取当前工作表数据
+        df = excel_reader.read_sheet(input_file, sheet_name)
+        result_df = split_punch_columns(df)
+        if result_df is None:
+            print(f"警告：工作表 '{sheet_name}' 中未找到 '打卡时间' 列，已跳过")
+            continue
+
+        # 创建新工作表并写入处理后的数据
+        excel_export.write_sheet(new_wb, sheet_name, result_df)
+
+        processed_sheets += 1
+        print(f"已处理工作表：{sheet_name}，拆分了 {len(result_df)} 条打卡记录")
+
+    # 保存处理后的文件
+    new_wb.save(output_file)
+    print(f"\n处理完成！共处理 {processed_sheets} 个工作表，结果已保存到 {output_file}")
@@ -1,12 +1,12 @@
 import pandas as pd
-import openpyxl
-from openpyxl.utils.dataframe import dataframe_to_rows
-from datetime import datetime, timedelta
+from datetime import datetime, time, timedelta
 import os
+import sys
 
-current_dir = os.path.dirname(os.path.abspath(__file__))
-input_file = os.path.join(current_dir, '../temp_files/按打卡时间分列的打卡数据.xlsx')
-output_file = os.path.join(current_dir, '../temp_files/全班次处理后的打卡数据.xlsx')
+# 直接运行本脚本时，将项目根目录加入搜索路径以便导入 modules 包
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from modules import excel_export, excel_reader, schema, shift_engine, time_parse
 
 
 # 系统休息时间：次日05:00
@@ -16,13 +16,10 @@ SYSTEM_REST_TIME = datetime.strptime("05:00", "%H:%M").time()
 # 时间处理辅助函数
 def parse_time(time_str):
     """将时间字符串转换为datetime.time对象，失败返回None"""
-    if pd.isna(time_str) or str(time_str).strip() == "":
-        return None
-    try:
-        cleaned = str(time_str).strip().replace("次日", "").replace("凌晨", "").strip()
-        return datetime.strptime(cleaned, "%H:%M").time()
-    except:
+    minutes = time_parse.parse_punch(time_str)
+    if minutes == time_parse.MISSING:
         return None
+    return time(minutes // 60, minutes % 60)
 
 
 def round_down_to_hour(time_obj):
@@ -51,22 +48,10 @@ def time_diff_in_hours(time1, time2):
     return hours, minutes
 
 
-def format_time_diff(hours, minutes):
-    """将时间差格式化为"X小时Y分钟"字符串"""
-    if hours == 0 and minutes == 0:
-        return "0分钟"
-    parts = []
-    if hours > 0:
-        parts.append(f"{hours}小时")
-    if minutes > 0:
-        parts.append(f"{minutes}分钟")
-    return "".join(parts)
-
-
 def process_morning_shift(row):
     """处理早班打卡数据"""
     result = {
-        '上班卡类型': "", '迟到时间': "0分钟", '早退时间': "0分钟",  # 新增早退时间列
+        '上班卡类型': "", '迟到时间': 0, '早退时间': 0,  # 迟到、早退时间为分钟数
         '中午下班卡类型': "", '中午上班卡类型': "", '白天加班时长(小时)': "",
         '下班卡类型': "", '晚上加班时长(小时)': "", '打卡状态': ""
     }
@@ -96,7 +81,7 @@ def process_morning_shift(row):
         elif work_start < valid_morning_punch <= work_end_am:
             result['上班卡类型'] = "迟到"
             late_h, late_m = time_diff_in_hours(valid_morning_punch, work_start)
-            result['迟到时间'] = format_time_diff(late_h, late_m)
+            result['迟到时间'] = late_h * 60 + late_m
         else:
             result['上班卡类型'] = "缺勤"
     else:
@@ -159,8 +144,8 @@ def process_morning_shift(row):
                 early_h, early_m = time_diff_in_hours(work_end_pm, valid_evening_punch)
                 total_early_hours = early_h + (1 if early_m > 0 else 0)  # 分钟数大于0则进1小时
                 
-                # 仅保留小时数（0小时则显示0）
-                result['早退时间'] = f"{total_early_hours}小时"
+                # 仅保留整小时（分钟数为60的倍数）
+                result['早退时间'] = total_early_hours * 60
                 result['下班卡类型'] = f"{rounded_time.strftime('%H:%M')}下班卡-早退"
 
     else:
@@ -180,7 +165,7 @@ def process_morning_shift(row):
 def process_afternoon_shift(row):
     """处理中班打卡数据"""
     result = {
-        '上班卡类型': "", '迟到时间': "0分钟", '早退时间': "0分钟",  # 新增早退时间列
+        '上班卡类型': "", '迟到时间': 0, '早退时间': 0,  # 迟到、早退时间为分钟数
         '中午下班卡类型': "", '中午上班卡类型': "", '白天加班时长(小时)': "",
         '下班卡类型': "", '晚上加班时长(小时)': "", '打卡状态': ""
     }
@@ -210,7 +195,7 @@ def process_afternoon_shift(row):
         elif work_start < valid_afternoon_punch <= work_end_am:
             result['上班卡类型'] = "迟到"
             late_h, late_m = time_diff_in_hours(valid_afternoon_punch, work_start)
-            result['迟到时间'] = format_time_diff(late_h, late_m)
+            result['迟到时间'] = late_h * 60 + late_m
         else:
             result['上班卡类型'] = "缺勤"
     else:
@@ -269,7 +254,7 @@ def process_afternoon_shift(row):
             # 仅保留小时数（可根据需求选择向上取整或向下取整）
             total_early_hours = early_h + (1 if early_m > 0 else 0)  # 向上取整（如30分钟→1小时）
             # total_early_hours = early_h  # 向下取整（如30分钟→0小时）
-            result['早退时间'] = f"{total_early_hours}小时"
+            result['早退时间'] = total_early_hours * 60
             
             rounded_time = round_down_to_hour(valid_night_punch)
             result['下班卡类型'] = f"{rounded_time.strftime('%H:%M')}下班卡-早退"
@@ -298,7 +283,7 @@ def process_afternoon_shift(row):
 def process_night_shift(row):
     """处理晚班打卡数据"""
     result = {
-        '上班卡类型': "", '迟到时间': "0分钟", '早退时间': "0分钟",  # 新增早退时间列
+        '上班卡类型': "", '迟到时间': 0, '早退时间': 0,  # 迟到、早退时间为分钟数
         '中午下班卡类型': "", '中午上班卡类型': "", '白天加班时长(小时)': "",
         '下班卡类型': "", '晚上加班时长(小时)': "", '打卡状态': ""
     }
@@ -335,7 +320,7 @@ def process_night_shift(row):
         elif work_start2 < valid_night_punch <= work_end_limit: # 20:00-23:00打卡
             result['上班卡类型'] = "迟到"
             late_h, late_m = time_diff_in_hours(valid_night_punch, work_start)
-            result['迟到时间'] = format_time_diff(late_h, late_m)
+            result['迟到时间'] = late_h * 60 + late_m
         else: # 23:00后打卡视为缺勤
             result['上班卡类型'] = "缺勤"
     else:
@@ -356,7 +341,7 @@ def process_night_shift(row):
             # 计算早退时间（规定下班时间 - 实际打卡时间）
             early_h, early_m = time_diff_in_hours(work_end, valid_morning_punch)
             total_early_hours = early_h + (1 if early_m > 0 else 0)  # 向上取整（如30分钟→1小时）
-            result['早退时间'] = f"{total_early_hours}小时"
+            result['早退时间'] = total_early_hours * 60
             result['晚上加班时长(小时)'] = 0.0
         elif work_end < valid_morning_punch <= overtime_limit:
             rounded_time = round_down_to_hour(valid_morning_punch)
@@ -388,7 +373,7 @@ def process_night_shift(row):
 def process_logistics(row):
     """处理后勤部打卡数据"""
     result = {
-        '上班卡类型': "", '迟到时间': "", '早退时间': "",  # 新增早退时间列
+        '上班卡类型': "", '迟到时间': None, '早退时间': None,  # 后勤部不计迟到、早退
         '中午下班卡类型': "", '中午上班卡类型': "", '白天加班时长(小时)': "",
         '下班卡类型': "", '晚上加班时长(小时)': "", '打卡状态': ""
     }
@@ -410,45 +395,29 @@ def process_logistics(row):
     return result
 
 
-# 加载工作簿
-wb = openpyxl.load_workbook(input_file)
-# 创建新工作簿用于保存处理后的数据
-new_wb = openpyxl.Workbook()
-# 移除默认创建的工作表
-default_sheet = new_wb.active
-new_wb.remove(default_sheet)
-
-# 复制"原始数据"工作表到新工作簿
-if '原始数据' in wb.sheetnames:
-    original_sheet = wb['原始数据']
-    new_ws = new_wb.create_sheet(title='原始数据')
-    for row in original_sheet.iter_rows(values_only=True):
-        new_ws.append(row)
-
-# 处理其他工作表
-processed_sheets = 0
-for sheet_name in wb.sheetnames:
-    if sheet_name == '原始数据':
-        continue
-
-    # 读取当前工作表数据
-    df = pd.read_excel(input_file, sheet_name=sheet_name)
-
-    # 检查必要的列是否存在
-    required_cols = ['姓名', '员工ID', '部门', '班次',
-                     '第一次打卡', '第二次打卡', '第三次打卡', '第四次打卡']
-    missing_cols = [col for col in required_cols if col not in df.columns]
-    if missing_cols:
-        print(f"警告：工作表 '{sheet_name}' 缺少必要列 {missing_cols}，已跳过")
-        continue
-
-    # 新增处理结果列（包含早退时间）
-    result_cols = [
-        '上班卡类型', '迟到时间', '早退时间',  # 新增早退时间列
-        '中午下班卡类型', '中午上班卡类型', '白天加班时长(小时)',
-        '下班卡类型', '晚上加班时长(小时)', '打卡状态'
-    ]
-    for col in result_cols:
+# 必要的列
+REQUIRED_COLS = ['姓名', '员工ID', '部门', '班次',
+                 '第一次打卡', '第二次打卡', '第三次打卡', '第四次打卡']
+
+# 新增处理结果列（包含早退时间）
+RESULT_COLS = [
+    '上班卡类型', '迟到时间', '早退时间',  # 新增早退时间列
+    '中午下班卡类型', '中午上班卡类型', '白天加班时长(小时)',
+    '下班卡类型', '晚上加班时长(小时)', '打卡状态'
+]
+
+
+def process_sheet(df, subsidy=False):
+    """
+    按班次处理单个工作表，返回添加结果列后的DataFrame（向量化计算，见 shift_engine.py）
+    subsidy: 为True时同时添加"夜班补贴时长(小时)"列（即 66.py 的结果）
+    """
+    return shift_engine.apply_shift_rules(df, subsidy)
+
+
+def process_sheet_by_row(df):
+    """逐行调用 process_*_shift 处理单个工作表，用于核对向量化计算的结果"""
+    for col in RESULT_COLS:
         df[col] = ""
 
     # 按班次处理每一行数据
@@ -468,21 +437,56 @@ for sheet_name in wb.sheetnames:
             elif shift == '晚班':
                 results = process_night_shift(row)
             else:
-                # 未知班次
-                results = {col: "未知班次" for col in result_cols}
+                # 未知班次（迟到、早退时间为空值）
+                results = {col: None if col in shift_engine.DURATION_COLS else "未知班次" for col in RESULT_COLS}
 
         # 将处理结果写入DataFrame
         for col, value in results.items():
             df.at[idx, col] = value
 
-    # 创建新工作表并写入处理后的数据
-    new_ws = new_wb.create_sheet(title=sheet_name)
-    for r in dataframe_to_rows(df, index=False, header=True):
-        new_ws.append(r)
+    # 迟到、早退时间为分钟数（与 process_sheet 的结果类型相同）
+    for col in shift_engine.DURATION_COLS:
+        df[col] = pd.array(df[col].tolist(), dtype=schema.DURATION_DTYPE)
+    return df
+
+
+if __name__ == "__main__":
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    input_file = sys.argv[1] if len(sys.argv) > 1 else os.path.join(current_dir, '../temp_files/按打卡时间分列的打卡数据.xlsx')
+    output_file = sys.argv[2] if len(sys.argv) > 2 else os.path.join(current_dir, '../temp_files/全班次处理后的打卡数据.xlsx')
+
+    # 加载工作簿
+    sheet_names = excel_reader.sheet_names(input_file)
+    # 创建新工作簿用于保存处理后的数据（逐个工作表写入磁盘）
+    new_wb = excel_export.new_workbook()
+
+    # 复制"原始数据"工作表到新工作簿
+    if '原始数据' in sheet_names:
+        excel_export.write_sheet(new_wb, '原始数据', excel_reader.read_sheet(input_file, '原始数据'))
+
+    # 处理其他工作表
+    processed_sheets = 0
+    for sheet_name in sheet_names:
+        if sheet_name == '原始数据':
+            continue
+
+        # 读取当前工作表数据
+        df = excel_reader.read_sheet(input_file, sheet_name)
+
+        # 检查必要的列是否存在
+        missing_cols = [col for col in REQUIRED_COLS if col not in df.columns]
+        if missing_cols:
+            print(f"警告：工作表 '{sheet_name}' 缺少必要列 {missing_cols}，已跳过")
+            continue
+
+        df = process_sheet(df)
+
+        # 创建新工作表并写入处理后的数据
+        excel_export.write_sheet(new_wb, sheet_name, df)
 
-    processed_sheets += 1
-    print(f"已处理工作表：{sheet_name}，共处理 {len(df)} 条记录")
+        processed_sheets += 1
+        print(f"已处理工作表：{sheet_name}，共处理 {len(df)} 条记录")
 
-# 保存处理后的文件
-new_wb.save(output_file)
-print(f"\n处理完成！共处理 {processed_sheets} 个工作表，结果已保存到 {output_file}")
\ No newline at end of file
+    # 保存处理后的文件
+    new_wb.save(output_file)
+    print(f"\n处理完成！共处理 {processed_sheets} 个工作表，结果已保存到 {output_file}")
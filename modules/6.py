@@ -1,181 +1,187 @@
 import pandas as pd
-import openpyxl
 from datetime import datetime
 import os
+import sys
 
-# 输入文件路径（使用带补贴时长的处理后数据）
-current_dir = os.path.dirname(os.path.abspath(__file__))
-input_file = os.path.join(current_dir, '../temp_files/员工打卡记录_带补贴时长.xlsx')
-output_file = os.path.join(current_dir, '../temp_files/打卡数据汇总统计.xlsx')
-
-# 读取工作簿中的所有工作表
-xls = pd.ExcelFile(input_file)
-sheet_names = xls.sheet_names
-
-# 筛选需要处理的工作表（排除'原始数据'）
-process_sheets = [name for name in sheet_names if name != '原始数据']
-
-if not process_sheets:
-    print("没有需要处理的工作表（除原始数据外）")
-else:
-    # 存储所有工作表的每日统计结果（用于最终汇总）
-    daily_summaries = []
-    
-    # 处理迟到时间转换函数
-    def parse_late_time(time_str):
-        if pd.isna(time_str) or str(time_str).strip() in ["", "0分钟"]:
-            return 0
-        time_str = str(time_str).strip()
-        hours = 0
-        minutes = 0
-        if '小时' in time_str:
-            h_part = time_str.split('小时')[0]
-            hours = int(h_part) if h_part.isdigit() else 0
-            remaining = time_str.split('小时')[1]
-            if '分钟' in remaining:
-                m_part = remaining.split('分钟')[0]
-                minutes = int(m_part) if m_part.isdigit() else 0
-        elif '分钟' in time_str:
-            m_part = time_str.split('分钟')[0]
-            minutes = int(m_part) if m_part.isdigit() else 0
-        return hours * 60 + minutes  # 返回总分钟数
-
-    # 处理早退时间转换函数（将"X小时"转换为小时数）
-    def parse_early_leave(time_str):
-        if pd.isna(time_str) or str(time_str).strip() in ["", "0小时"]:
-            return 0.0
-        time_str = str(time_str).strip()
-        if '小时' in time_str:
-            h_part = time_str.split('小时')[0]
-            return float(h_part) if h_part.isdigit() else 0.0
-        return 0.0
-
-    # 转换分钟数为时间字符串
-    def format_late_time(total_minutes):
-        if total_minutes == 0:
-            return "0分钟"
-        hours = total_minutes // 60
-        minutes = total_minutes % 60
-        parts = []
-        if hours > 0:
-            parts.append(f"{hours}小时")
-        if minutes > 0:
-            parts.append(f"{minutes}分钟")
-        return "".join(parts)
-
-    # 分组统计函数（包含早退时间处理）
-    def aggregate_func(group, sheet_name):
-        work_days = group[group['打卡状态'] == '正常'].shape[0]
-        attendance_hours = work_days * 8
-        day_ot = group['白天加班时长(小时)'].sum()
-        night_ot = group['晚上加班时长(小时)'].sum()
-        subsidy_ot = group['夜班补贴时长(小时)'].sum()
-        
-        # 计算早退总小时数（新增）
-        if '早退时间' in group.columns:
-            group['早退小时数'] = group['早退时间'].apply(parse_early_leave)
-            zt_ot = group['早退小时数'].sum()
-            total_early_leave = zt_ot  # 保留原始早退小时数用于显示
-        else:
-            zt_ot = 0
-            total_early_leave = 0
-        
-        # 总工时计算（扣除早退时间）
-        total_hours = attendance_hours + day_ot + night_ot - zt_ot
-
-        # 迟到时间处理
-        total_late_minutes = group['迟到分钟数'].sum()
-        late_str = format_late_time(total_late_minutes)
-
-        # 基础信息
-        dept = group['部门'].iloc[0] if not group['部门'].empty else ""
-        shift = group['班次'].iloc[0] if not group['班次'].empty else ""
-        
-        return pd.Series({
-            '日期': sheet_name,
-            '部门': dept,
-            '班次': shift,
-            '上班天数': work_days,
-            '出勤时间': attendance_hours,
-            '白天加班': round(day_ot, 1),
-            '晚上加班': round(night_ot, 1),
-            '早退时间(小时)': round(total_early_leave, 1),  # 新增：显示每日早退小时数
-            '出勤总工时': round(total_hours, 1),
-            '夜班补贴': round(subsidy_ot, 1),
-            '迟到总时间': late_str
-        })
-
-    # 创建ExcelWriter用于写入每日统计和总汇总
-    with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-        # 1. 处理每个工作表（每天）并生成每日统计
+# 直接运行本脚本时，将项目根目录加入搜索路径以便导入 modules 包
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from modules import durations, excel_export, excel_reader
+
+
+# 按员工分组统计的键
+GROUP_KEYS = ['姓名', '员工ID']
+
+# 每日统计：{结果列: (明细列, 汇总方式)}
+DAILY_AGGS = {
+    '上班天数': ('正常天数', 'sum'),
+    '白天加班': ('白天加班时长(小时)', 'sum'),
+    '晚上加班': ('晚上加班时长(小时)', 'sum'),
+    '早退分钟数': ('早退分钟数', 'sum'),
+    '夜班补贴': ('夜班补贴时长(小时)', 'sum'),
+    '迟到总时间': ('迟到分钟数', 'sum'),  # 分钟数，导出时显示为"X小时Y分钟"
+}
+
+# 总汇总：由每日统计累加，{结果列: (每日统计列, 汇总方式)}
+TOTAL_AGGS = {
+    '总上班天数': ('上班天数', 'sum'),
+    '总出勤时间': ('出勤时间', 'sum'),
+    '总白天加班': ('白天加班', 'sum'),
+    '总晚上加班': ('晚上加班', 'sum'),
+    '总早退时间(小时)': ('早退时间(小时)', 'sum'),
+    '总出勤总工时': ('出勤总工时', 'sum'),
+    '总夜班补贴': ('夜班补贴', 'sum'),
+    '总迟到时间': ('迟到总时间', 'sum'),
+}
+
+
+def round_1(series):
+    """逐个值保留1位小数（与Python内置round一致，Series.round 在 x.x5 附近的舍入结果不同）"""
+    return series.map(lambda value: round(value, 1))
+
+
+def first_values(grouped, cols):
+    """取每个员工第一行的基本信息（第一行为空时仍取空值）"""
+    return grouped[cols].first(skipna=False)
+
+
+# 检查必要列（新增早退时间列检查）
+REQUIRED_COLS = [
+    '姓名', '员工ID', '部门', '班次', '打卡状态',
+    '白天加班时长(小时)', '晚上加班时长(小时)', '迟到时间', '夜班补贴时长(小时)'
+]
+
+
+def summarize_day(df, sheet):
+    """生成单个工作表（每天）的按员工统计，缺少必要列时返回None"""
+    # 早退时间列非必需，仅做提示
+    if '早退时间' not in df.columns:
+        print(f"警告：工作表 {sheet} 缺少'早退时间'列，将按0处理")
+
+    missing_cols = [col for col in REQUIRED_COLS if col not in df.columns]
+    if missing_cols:
+        print(f"警告：工作表 {sheet} 缺少列 {missing_cols}，已跳过")
+        return None
+
+    # 数据预处理
+    df['白天加班时长(小时)'] = pd.to_numeric(df['白天加班时长(小时)'], errors='coerce').fillna(0)
+    df['晚上加班时长(小时)'] = pd.to_numeric(df['晚上加班时长(小时)'], errors='coerce').fillna(0)
+    df['夜班补贴时长(小时)'] = pd.to_numeric(df['夜班补贴时长(小时)'], errors='coerce').fillna(0)
+    # 迟到、早退时间为分钟数；从Excel读入的文本按原格式解析
+    df['迟到分钟数'] = durations.to_minutes(df['迟到时间'])
+    if '早退时间' in df.columns:
+        df['早退分钟数'] = durations.to_minutes(df['早退时间'], durations.parse_early_leave)
+    else:
+        df['早退分钟数'] = 0
+
+    df['正常天数'] = (df['打卡状态'] == '正常').astype('int64')
+
+    # 按员工分组一次性汇总各列
+    grouped = df.groupby(GROUP_KEYS, observed=True)
+    daily_summary = grouped.agg(**DAILY_AGGS)
+    daily_summary[['部门', '班次']] = first_values(grouped, ['部门', '班次'])
+
+    # 出勤时间：上班天数 * 8小时；总工时扣除早退时间（早退时间为整小时的分钟数）
+    early_hours = daily_summary['早退分钟数'] / 60
+    daily_summary['出勤时间'] = daily_summary['上班天数'] * 8
+    daily_summary['出勤总工时'] = round_1(daily_summary['出勤时间'] + daily_summary['白天加班']
+                                     + daily_summary['晚上加班'] - early_hours)
+    daily_summary['早退时间(小时)'] = round_1(early_hours)
+    for col in ['白天加班', '晚上加班', '夜班补贴']:
+        daily_summary[col] = round_1(daily_summary[col])
+    daily_summary = daily_summary.reset_index()
+    daily_summary.insert(0, '日期', sheet)
+
+    # 调整列顺序（新增早退时间列）
+    return daily_summary[['日期', '姓名', '员工ID', '部门', '班次',
+                          '上班天数', '出勤时间', '白天加班',
+                          '晚上加班', '早退时间(小时)',  # 新增列
+                          '出勤总工时', '夜班补贴', '迟到总时间']]
+
+
+def day_sheet_name(tm, date):
+    """每日统计工作表名称，沿用 "{tm}{日}日" 的格式（date 为日期，或没有月份时的日号）"""
+    return f'{tm}{int(getattr(date, "day", date))}日'
+
+
+def summarize_by_date(df, tm):
+    """按"日期"列逐日生成统计，返回 {每日工作表名称: 每日统计}（名称见 day_sheet_name）"""
+    daily_summaries = {}
+    for date, day_df in df.groupby('日期', sort=True):
+        sheet = day_sheet_name(tm, date)
+        daily_summary = summarize_day(day_df.reset_index(drop=True), sheet)
+        if daily_summary is not None:
+            daily_summaries[sheet] = daily_summary
+    return daily_summaries
+
+
+def summarize_total(daily_summaries):
+    """将所有日期的每日统计合并，生成按员工的总汇总"""
+    all_daily = pd.concat(daily_summaries, ignore_index=True)
+
+    # 每日迟到总时间为分钟数，直接求和（从Excel读入的文本按原格式解析）
+    all_daily['迟到总时间'] = durations.to_minutes(all_daily['迟到总时间'])
+
+    # 按员工分组，由每日统计累加得到总汇总
+    grouped = all_daily.groupby(GROUP_KEYS, observed=True)
+    total_summary = grouped.agg(**TOTAL_AGGS)
+    total_summary[['部门', '班次']] = first_values(grouped, ['部门', '班次'])
+    for col in ['总白天加班', '总晚上加班', '总早退时间(小时)', '总出勤总工时', '总夜班补贴']:
+        total_summary[col] = round_1(total_summary[col])
+    total_summary = total_summary.reset_index()
+
+    # 调整总汇总列顺序（新增总早退时间列）
+    return total_summary[['姓名', '员工ID', '部门', '班次',
+                          '总上班天数', '总出勤时间', '总白天加班',
+                          '总晚上加班', '总早退时间(小时)',  # 新增列
+                          '总出勤总工时', '总夜班补贴', '总迟到时间']]
+
+
+def write_summary(output_file, daily_summaries, total_summary):
+    """写入每日统计工作表（{日期}_统计）和总汇总统计工作表"""
+    wb = excel_export.new_workbook()
+    for sheet, daily_summary in daily_summaries.items():
+        excel_export.write_sheet(wb, f'{sheet}_统计', daily_summary)
+    if total_summary is not None:
+        excel_export.write_sheet(wb, '总汇总统计', total_summary)
+    wb.save(output_file)
+
+
+if __name__ == "__main__":
+    # 输入文件路径（使用带补贴时长的处理后数据）
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    input_file = sys.argv[1] if len(sys.argv) > 1 else os.path.join(current_dir, '../temp_files/员工打卡记录_带补贴时长.xlsx')
+    output_file = sys.argv[2] if len(sys.argv) > 2 else os.path.join(current_dir, '../temp_files/打卡数据汇总统计.xlsx')
+
+    # 读取工作簿中的所有工作表
+    sheet_names = excel_reader.sheet_names(input_file)
+
+    # 筛选需要处理的工作表（排除'原始数据'）
+    process_sheets = [name for name in sheet_names if name != '原始数据']
+
+    if not process_sheets:
+        print("没有需要处理的工作表（除原始数据外）")
+    else:
+        # 存储所有工作表的每日统计结果（用于最终汇总）
+        daily_summaries = {}
+
+        # 1. 处理每个工作表并生成每日统计（1分割.py 生成的长表按"日期"列拆分为每天）
         for sheet in process_sheets:
-            df = pd.read_excel(xls, sheet_name=sheet)
-            
-            # 检查必要列（新增早退时间列检查）
-            required_cols = [
-                '姓名', '员工ID', '部门', '班次', '打卡状态',
-                '白天加班时长(小时)', '晚上加班时长(小时)', '迟到时间', '夜班补贴时长(小时)'
-            ]
-            # 早退时间列非必需，仅做提示
-            if '早退时间' not in df.columns:
-                print(f"警告：工作表 {sheet} 缺少'早退时间'列，将按0处理")
-            
-            missing_cols = [col for col in required_cols if col not in df.columns]
-            if missing_cols:
-                print(f"警告：工作表 {sheet} 缺少列 {missing_cols}，已跳过")
-                continue
-            
-            # 数据预处理
-            df['白天加班时长(小时)'] = pd.to_numeric(df['白天加班时长(小时)'], errors='coerce').fillna(0)
-            df['晚上加班时长(小时)'] = pd.to_numeric(df['晚上加班时长(小时)'], errors='coerce').fillna(0)
-            df['夜班补贴时长(小时)'] = pd.to_numeric(df['夜班补贴时长(小时)'], errors='coerce').fillna(0)
-            df['迟到分钟数'] = df['迟到时间'].apply(parse_late_time)
-            
-            # 按员工分组计算每日统计
-            daily_summary = df.groupby(['姓名', '员工ID']).apply(
-                lambda x: aggregate_func(x, sheet)
-            ).reset_index()
-            
-            # 调整列顺序（新增早退时间列）
-            daily_summary = daily_summary[['日期', '姓名', '员工ID', '部门', '班次',
-                                           '上班天数', '出勤时间', '白天加班',
-                                           '晚上加班', '早退时间(小时)',  # 新增列
-                                           '出勤总工时', '夜班补贴', '迟到总时间']]
-            
-            # 写入当前工作表的统计结果
-            daily_summary.to_excel(writer, sheet_name=f'{sheet}_统计', index=False)
-            daily_summaries.append(daily_summary)
-            print(f"已生成 {sheet} 的每日统计")
+            df = excel_reader.read_sheet(input_file, sheet)
+            if '日期' in df.columns:
+                sheet_summaries = summarize_by_date(df, sheet)
+            else:
+                daily_summary = summarize_day(df, sheet)
+                sheet_summaries = {} if daily_summary is None else {sheet: daily_summary}
+            for name, daily_summary in sheet_summaries.items():
+                daily_summaries[name] = daily_summary
+                print(f"已生成 {name} 的每日统计")
 
         # 2. 生成总汇总表（所有日期合并，包含早退汇总）
+        total_summary = None
         if daily_summaries:
-            all_daily = pd.concat(daily_summaries, ignore_index=True)
-            
-            # 先将每日迟到时间转换为分钟数，再求和
-            all_daily['迟到总分钟数'] = all_daily['迟到总时间'].apply(parse_late_time)
-            
-            # 按员工分组计算总汇总
-            total_summary = all_daily.groupby(['姓名', '员工ID']).apply(lambda group: pd.Series({
-                '部门': group['部门'].iloc[0] if not group['部门'].empty else "",
-                '班次': group['班次'].iloc[0] if not group['班次'].empty else "",
-                '总上班天数': group['上班天数'].sum(),
-                '总出勤时间': group['出勤时间'].sum(),
-                '总白天加班': round(group['白天加班'].sum(), 1),
-                '总晚上加班': round(group['晚上加班'].sum(), 1),
-                '总早退时间(小时)': round(group['早退时间(小时)'].sum(), 1),  # 新增：总早退时间
-                '总出勤总工时': round(group['出勤总工时'].sum(), 1),
-                '总夜班补贴': round(group['夜班补贴'].sum(), 1),
-                '总迟到时间': format_late_time(group['迟到总分钟数'].sum())
-            })).reset_index()
-            
-            # 调整总汇总列顺序（新增总早退时间列）
-            total_summary = total_summary[['姓名', '员工ID', '部门', '班次',
-                                           '总上班天数', '总出勤时间', '总白天加班',
-                                           '总晚上加班', '总早退时间(小时)',  # 新增列
-                                           '总出勤总工时', '总夜班补贴', '总迟到时间']]
-            
-            # 写入总汇总表
-            total_summary.to_excel(writer, sheet_name='总汇总统计', index=False)
+            total_summary = summarize_total(list(daily_summaries.values()))
             print("已生成总汇总统计")
 
-    print(f"所有统计完成！结果已保存到 {output_file}")
\ No newline at end of file
+        write_summary(output_file, daily_summaries, total_summary)
+        print(f"所有统计完成！结果已保存到 {output_file}")
@@ -1,54 +1,50 @@
-import pandas as pd
-from datetime import datetime, timedelta
+"""
+夜班补贴时长
+
+下班卡时间在 04:00～09:00 之间（不含两端）时，补贴时长为下班卡时间与 04:00 的差值（小时）。
+流水线中这一步与全班次处理合并计算（见 shift_engine.apply_shift_rules），
+本脚本单独运行时从已处理文件的"下班卡类型"列（如"06:30下班卡"）中取下班卡时间。
+"""
 import os
+import sys
 
+# 直接运行本脚本时，将项目根目录加入搜索路径以便导入 modules 包
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from modules import excel_export, excel_reader, shift_engine, time_parse
 
-def calculate_overtime(file_path, output_path):
-    # 读取Excel文件中的所有工作表
-    excel_file = pd.ExcelFile(file_path)
-    sheet_names = excel_file.sheet_names
 
-    # 创建一个ExcelWriter对象用于写入结果
-    with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
-        # 遍历每个工作表
-        for sheet_name in sheet_names:
-            # 读取当前工作表数据
-            df = pd.read_excel(excel_file, sheet_name=sheet_name)
+def _label_minutes(label):
+    """从下班卡类型文本中取下班卡时间（分钟数），不是 "HH:MM下班卡" 形式时返回 MISSING"""
+    return time_parse.parse_hhmm(str(label).replace("下班卡", ""))
+
 
-            # 确保"下班卡类型"列是字符串类型
-            df['下班卡类型'] = df['下班卡类型'].astype(str)
+def clock_out_minutes(labels):
+    """将一列下班卡类型转换为下班卡时间的分钟数数组，每个不同的取值只解析一次"""
+    return time_parse.parse_series(labels, _label_minutes)
 
-            # 定义函数计算夜班补贴时长
-            def calculate_subsidy(time_str):
-                try:
-                    # 尝试解析时间（假设格式为HH:MM）
-                    time_time = time_str.replace("下班卡", "")
-                    time_obj = datetime.strptime(time_time, '%H:%M').time()
-                    print(time_obj)
 
-                    # 定义时间范围：4:00到9:00
-                    start_time = datetime.strptime('04:00', '%H:%M').time()
-                    end_time = datetime.strptime('09:00', '%H:%M').time()
+def add_subsidy(df):
+    """为单个工作表添加"夜班补贴时长(小时)"列"""
+    df[shift_engine.SUBSIDY_COL] = shift_engine.subsidy_hours(clock_out_minutes(df['下班卡类型']))
+    return df
 
-                    # 检查时间是否在4:00到9:00之间
-                    if start_time < time_obj < end_time:
-                        print(time_obj)
-                        # 计算与4:00的差值（小时）
-                        time_diff = datetime.combine(datetime.today(), time_obj) - datetime.combine(datetime.today(),
-                                                                                                    start_time)
-                        print(time_diff)
-                        return time_diff.total_seconds() / 3600  # 转换为小时
-                    else:
-                        return 0.0
-                except:
-                    # 处理无法解析的情况
-                    return 0.0
 
-            # 应用函数计算夜班补贴时长并添加为新列
-            df['夜班补贴时长(小时)'] = df['下班卡类型'].apply(calculate_subsidy)
+def calculate_overtime(file_path, output_path):
+    # 读取Excel文件中的所有工作表
+    sheet_names = excel_reader.sheet_names(file_path)
+
+    # 创建工作簿用于写入结果（逐个工作表写入磁盘）
+    wb = excel_export.new_workbook()
+    # 遍历每个工作表
+    for sheet_name in sheet_names:
+        # 读取当前工作表数据
+        df = excel_reader.read_sheet(file_path, sheet_name)
+        df = add_subsidy(df)
 
-            # 将处理后的工作表写入新的Excel文件
-            df.to_excel(writer, sheet_name=sheet_name, index=False)
+        # 将处理后的工作表写入新的Excel文件
+        excel_export.write_sheet(wb, sheet_name, df)
+    wb.save(output_path)
 
     print(f"处理完成！结果已保存至: {output_path}")
 
@@ -57,10 +53,10 @@ def calculate_overtime(file_path, output_path):
 if __name__ == "__main__":
     # 输入文件路径
     current_dir = os.path.dirname(os.path.abspath(__file__))
-    input_file = os.path.join(current_dir, '../temp_files/全班次处理后的打卡数据.xlsx')
+    input_file = sys.argv[1] if len(sys.argv) > 1 else os.path.join(current_dir, '../temp_files/全班次处理后的打卡数据.xlsx')
     # input_file = "全班次处理后的打卡数据.xlsx"
     # # 输出文件路径
     # output_file = "员工打卡记录_带补贴时长.xlsx"
-    output_file = os.path.join(current_dir, '../temp_files/员工打卡记录_带补贴时长.xlsx')
+    output_file = sys.argv[2] if len(sys.argv) > 2 else os.path.join(current_dir, '../temp_files/员工打卡记录_带补贴时长.xlsx')
     # 调用函数进行处理
     calculate_overtime(input_file, output_file)
@@ -0,0 +1,92 @@
+"""
+时长的表示与显示
+
+迟到、早退等时长在处理过程中一律以整数分钟数保存（迟到时间、早退时间、迟到总时间、总迟到时间列），
+只在写入Excel时转换为 "X小时Y分钟" 之类的文本（见 excel_export.write_sheet）。
+早退时长按规则向上取整到整小时，保存的分钟数是60的倍数，显示为 "X小时"。
+与原脚本的显示文本有一处不同：晚班下班卡恰好为02:00时，原脚本按早退处理，早退时间显示为 "0小时"；
+分钟数无法区分这种情况与没有早退，现在与没有早退时相同，显示为 "0分钟"（统计结果不变）。
+
+parse_* 函数用于读取已写成文本的旧文件（各脚本单独运行时从Excel读入的数据）。
+"""
+import pandas as pd
+
+# 以分钟数保存、显示为 "X小时Y分钟" 的列
+MINUTE_COLS = ['迟到时间', '迟到总时间', '总迟到时间']
+# 以分钟数保存、显示为 "X小时" 的列（早退时间已取整到整小时）
+HOUR_COLS = ['早退时间']
+
+
+def format_minutes(total_minutes):
+    """将分钟数格式化为 "X小时Y分钟"，0 显示为 "0分钟" """
+    hours, minutes = divmod(int(total_minutes), 60)
+    if hours == 0 and minutes == 0:
+        return "0分钟"
+    parts = []
+    if hours > 0:
+        parts.append(f"{hours}小时")
+    if minutes > 0:
+        parts.append(f"{minutes}分钟")
+    return "".join(parts)
+
+
+def format_hours(total_minutes):
+    """将整小时的分钟数格式化为 "X小时"，0 显示为 "0分钟"（与没有早退时相同，原脚本中晚班02:00下班为 "0小时"）"""
+    if total_minutes == 0:
+        return "0分钟"
+    return f"{int(total_minutes) // 60}小时"
+
+
+def parse_late_time(time_str):
+    """将 "X小时Y分钟" 文本转换为分钟数，无法识别时按0处理"""
+    if pd.isna(time_str) or str(time_str).strip() in ["", "0分钟"]:
+        return 0
+    time_str = str(time_str).strip()
+    hours = 0
+    minutes = 0
+    if '小时' in time_str:
+        h_part = time_str.split('小时')[0]
+        hours = int(h_part) if h_part.isdigit() else 0
+        remaining = time_str.split('小时')[1]
+        if '分钟' in remaining:
+            m_part = remaining.split('分钟')[0]
+            minutes = int(m_part) if m_part.isdigit() else 0
+    elif '分钟' in time_str:
+        m_part = time_str.split('分钟')[0]
+        minutes = int(m_part) if m_part.isdigit() else 0
+    return hours * 60 + minutes
+
+
+def parse_early_leave(time_str):
+    """将 "X小时" 文本转换为分钟数，无法识别时按0处理"""
+    if pd.isna(time_str) or str(time_str).strip() in ["", "0小时"]:
+        return 0
+    time_str = str(time_str).strip()
+    if '小时' in time_str:
+        h_part = time_str.split('小时')[0]
+        return int(h_part) * 60 if h_part.isdigit() else 0
+    return 0
+
+
+def to_minutes(series, parse=parse_late_time):
+    """
+    取一列时长的分钟数（空值按0），返回 int64 的Series
+    已是数值列时直接使用；从Excel读入的文本列用 parse 逐个解析
+    """
+    if pd.api.types.is_numeric_dtype(series):
+        return series.fillna(0).astype('int64')
+    return series.map(parse).astype('int64')
+
+
+def render(df):
+    """将分钟数列转换为显示文本，返回新的DataFrame；没有此类列或已是文本时原样返回"""
+    cols = [col for col in MINUTE_COLS + HOUR_COLS
+            if col in df.columns and pd.api.types.is_numeric_dtype(df[col])]
+    if not cols:
+        return df
+    df = df.copy()
+    for col in cols:
+        formatter = format_hours if col in HOUR_COLS else format_minutes
+        values = df[col]
+        df[col] = values.map(formatter, na_action='ignore').astype(object).where(values.notna(), None)
+    return df
@@ -0,0 +1,79 @@
+"""
+Excel导出
+
+需要写出Excel文件的地方（汇总统计、中间结果下载、各脚本单独运行时的输出）统一通过这里写文件。
+使用 openpyxl 的 write_only 模式逐行写入磁盘，内存占用不随单元格数量增长；
+单元格类型、表头样式及日期格式与 pandas.DataFrame.to_excel(index=False) 的输出一致。
+以分钟数保存的时长列（迟到时间等）在这里才转换为 "X小时Y分钟" 文本（见 durations.py）。
+"""
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
+
+from modules import durations
+
+# 表头样式（与pandas一致：加粗、细边框、水平居中、顶端对齐）
+HEADER_FONT = Font(bold=True)
+HEADER_BORDER = Border(left=Side(style='thin'), right=Side(style='thin'),
+                       top=Side(style='thin'), bottom=Side(style='thin'))
+HEADER_ALIGNMENT = Alignment(horizontal='center', vertical='top')
+# 日期时间列的显示格式（与pandas默认值一致）
+DATETIME_FORMAT = 'YYYY-MM-DD HH:MM:SS'
+# 每次转换的行数，转换后的行写入磁盘后即可释放
+CHUNK_ROWS = 10000
+
+
+def _header_cell(ws, value):
+    cell = WriteOnlyCell(ws, value=value)
+    cell.font = HEADER_FONT
+    cell.border = HEADER_BORDER
+    cell.alignment = HEADER_ALIGNMENT
+    return cell
+
+
+def _chunk_values(chunk):
+    """将一段数据转换为Python原生值：空值写为空单元格，numpy数值转为int/float，无穷大写为"inf"（与pandas相同）"""
+    values = chunk.astype(object).where(chunk.notna(), None)
+    for col in chunk.columns[[pd.api.types.is_float_dtype(dtype) for dtype in chunk.dtypes]]:
+        column = chunk[col]
+        values.loc[column == np.inf, col] = 'inf'
+        values.loc[column == -np.inf, col] = '-inf'
+    return values
+
+
+def new_workbook():
+    """创建 write_only 工作簿，配合 write_sheet 逐个工作表写入，最后调用 wb.save(路径)"""
+    return Workbook(write_only=True)
+
+
+def write_sheet(wb, sheet_name, df, header=True):
+    """向 write_only 工作簿追加一个工作表，逐段写入DataFrame的内容"""
+    ws = wb.create_sheet(title=sheet_name)
+    df = durations.render(df)
+    if header:
+        ws.append([_header_cell(ws, col) for col in df.columns])
+
+    datetime_cols = [i for i, dtype in enumerate(df.dtypes) if pd.api.types.is_datetime64_any_dtype(dtype)]
+    for start in range(0, len(df), CHUNK_ROWS):
+        chunk = _chunk_values(df.iloc[start:start + CHUNK_ROWS])
+        for row in chunk.itertuples(index=False, name=None):
+            if datetime_cols:
+                row = list(row)
+                for i in datetime_cols:
+                    if row[i] is not None:
+                        cell = WriteOnlyCell(ws, value=row[i].to_pydatetime())
+                        cell.number_format = DATETIME_FORMAT
+                        row[i] = cell
+            ws.append(row)
+    return ws
+
+
+def write_sheets(path, sheets):
+    """将 {工作表名称: DataFrame} 写入Excel文件（不写索引，与 to_excel(index=False) 相同）"""
+    wb = new_workbook()
+    for sheet_name, df in sheets.items():
+        write_sheet(wb, sheet_name, df)
+    wb.save(path)
+    return path
@@ -0,0 +1,266 @@
+"""
+Excel读取
+
+以流式方式逐行读取工作表，每次只把一段数据行（chunk_rows 行）转换为DataFrame，
+内存占用取决于每段的行数而不是整个工作簿的大小。
+
+支持多种读取后端，按文件类型自动选择可用的最快后端：
+    calamine  Rust实现的读取库（需安装 python-calamine），支持 xlsx/xlsm/xls/xlsb/ods
+    openpyxl  openpyxl 只读模式，支持 xlsx/xlsm
+    csv       CSV文件（UTF-8 或 GB18030 编码），整个文件视为一个工作表
+某个后端打开文件失败时自动改用下一个可用的后端。
+各后端的单元格转换方式与 pd.read_excel 相同，读取结果与一次性读取整张表一致；
+只含空白字符的单元格在所有后端中都按空单元格处理（calamine 读取 xlsx 时会丢弃这类单元格的内容，
+pd.read_excel 的 openpyxl 方式则保留原样），使用哪个后端读取的结果都相同。
+各后端的读取速度可用 reader_benchmark.py 比较。
+"""
+import codecs
+import csv
+import importlib.util
+import os
+from datetime import date, time, timedelta
+
+import numpy as np
+import openpyxl
+import pandas as pd
+from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+from pandas.io.parsers import TextParser
+
+# 每段读取的数据行数
+CHUNK_ROWS = 5000
+# 自动选择后端时的优先顺序
+PREFERRED_BACKENDS = ['calamine', 'openpyxl', 'csv']
+# 判断CSV编码时读取的字节数
+_ENCODING_SAMPLE_BYTES = 1024 * 1024
+
+
+def _is_blank_text(value):
+    """只含空白字符（空格、制表符、换行、全角空格等）的字符串"""
+    return isinstance(value, str) and not value.strip()
+
+
+class OpenpyxlBackend:
+    """openpyxl 只读模式"""
+    name = 'openpyxl'
+    extensions = ('.xlsx', '.xlsm')
+
+    @staticmethod
+    def available():
+        return True
+
+    @staticmethod
+    def _convert_cell(cell):
+        # 与pandas相同：空单元格为""，错误值为NaN，整数值的数字转为int
+        if cell.value is None or _is_blank_text(cell.value):
+            return ""
+        if cell.data_type == TYPE_ERROR:
+            return np.nan
+        if cell.data_type == TYPE_NUMERIC:
+            value = int(cell.value)
+            if value == cell.value:
+                return value
+            return float(cell.value)
+        return cell.value
+
+    def sheet_names(self, file_path):
+        wb = openpyxl.load_workbook(file_path, read_only=True)
+        try:
+            return wb.sheetnames
+        finally:
+            wb.close()
+
+    def iter_rows(self, file_path, sheet_name):
+        wb = openpyxl.load_workbook(file_path, read_only=True)
+        try:
+            ws = wb[sheet_name]
+            ws.reset_dimensions()
+            for row in ws.rows:
+                yield [self._convert_cell(cell) for cell in row]
+        finally:
+            wb.close()
+
+
+class CalamineBackend:
+    """python-calamine（Rust实现）"""
+    name = 'calamine'
+    extensions = ('.xlsx', '.xlsm', '.xls', '.xlsb', '.ods')
+
+    @staticmethod
+    def available():
+        return importlib.util.find_spec('python_calamine') is not None
+
+    @staticmethod
+    def _convert_cell(value):
+        # 与pandas的calamine读取方式相同
+        if isinstance(value, str):
+            return "" if _is_blank_text(value) else value
+        if isinstance(value, float):
+            int_value = int(value)
+            return int_value if int_value == value else value
+        if isinstance(value, date):
+            return pd.Timestamp(value)
+        if isinstance(value, timedelta):
+            return pd.Timedelta(value)
+        if isinstance(value, time):
+            return value
+        return value
+
+    def sheet_names(self, file_path):
+        from python_calamine import CalamineWorkbook
+        return CalamineWorkbook.from_path(file_path).sheet_names
+
+    def iter_rows(self, file_path, sheet_name):
+        from python_calamine import CalamineWorkbook
+        sheet = CalamineWorkbook.from_path(file_path).get_sheet_by_name(sheet_name)
+        # calamine 从第一个非空单元格开始读取，补齐前面的空行、空列
+        start = sheet.start or (0, 0)
+        for _ in range(start[0]):
+            yield []
+        padding = [""] * start[1]
+        for row in sheet.iter_rows():
+            yield padding + [self._convert_cell(value) for value in row]
+
+
+class CsvBackend:
+    """CSV文件，工作表名称为文件名（不含扩展名）"""
+    name = 'csv'
+    extensions = ('.csv',)
+
+    @staticmethod
+    def available():
+        return True
+
+    @staticmethod
+    def _encoding(file_path):
+        with open(file_path, 'rb') as f:
+            sample = f.read(_ENCODING_SAMPLE_BYTES)
+        try:
+            codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+            return 'utf-8-sig'
+        except UnicodeDecodeError:
+            return 'gb18030'
+
+    def sheet_names(self, file_path):
+        return [os.path.splitext(os.path.basename(file_path))[0]]
+
+    def iter_rows(self, file_path, sheet_name):
+        with open(file_path, newline='', encoding=self._encoding(file_path)) as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                return
+            # 与Excel一致，日期列的列名（如"1"、"2"）作为数字
+            yield [int(col) if col.strip().isdigit() else col for col in header]
+            for row in reader:
+                yield [cell if cell.strip() else "" for cell in row]
+
+
+BACKENDS = {backend.name: backend for backend in (CalamineBackend(), OpenpyxlBackend(), CsvBackend())}
+
+
+def available_backends(file_path=None):
+    """按优先顺序返回可用的后端名称；指定文件时只返回支持该文件类型的后端"""
+    ext = os.path.splitext(file_path)[1].lower() if file_path else None
+    return [
+        name for name in PREFERRED_BACKENDS
+        if BACKENDS[name].available() and (ext is None or ext in BACKENDS[name].extensions)
+    ]
+
+
+def _candidates(file_path, backend):
+    if backend is not None:
+        if backend not in BACKENDS:
+            raise ValueError(f"未知的读取后端: {backend}")
+        if not BACKENDS[backend].available():
+            raise ValueError(f"读取后端 {backend} 不可用（未安装相关依赖）")
+        return [BACKENDS[backend]]
+    candidates = [BACKENDS[name] for name in available_backends(file_path)]
+    if not candidates:
+        ext = os.path.splitext(file_path)[1].lower()
+        if any(ext in reader.extensions for reader in BACKENDS.values()):
+            raise ValueError(f"读取 {ext} 文件需要安装 python-calamine")
+        raise ValueError(f"不支持的文件格式: {ext}")
+    return candidates
+
+
+def _trim_rows(rows):
+    """与pd.read_excel一致：去掉每行末尾的空单元格，工作表末尾的空行不输出，中间的空行照常输出"""
+    blank_rows = 0
+    for row in rows:
+        while row and row[-1] == "":
+            row.pop()
+        if not row:
+            blank_rows += 1
+            continue
+        for _ in range(blank_rows):
+            yield []
+        blank_rows = 0
+        yield row
+
+
+def _to_frame(header, rows):
+    width = max([len(header)] + [len(row) for row in rows])
+    data = [row + [""] * (width - len(row)) for row in [header] + rows]
+    return TextParser(data, header=0, skip_blank_lines=False).read()
+
+
+def _open_rows(file_path, sheet_name, backend):
+    """依次尝试各候选后端，返回 (后端, 工作表名称, 表头, 其余行的迭代器)"""
+    candidates = _candidates(file_path, backend)
+    for i, reader in enumerate(candidates):
+        try:
+            name = sheet_name if sheet_name is not None else reader.sheet_names(file_path)[0]
+            rows = _trim_rows(reader.iter_rows(file_path, name))
+            header = next(rows, None)
+            return reader, name, header, rows
+        except Exception as e:
+            if i == len(candidates) - 1:
+                raise
+            print(f"读取后端 {reader.name} 打开文件失败（{e}），改用 {candidates[i + 1].name}")
+
+
+def sheet_names(file_path, backend=None):
+    """返回工作簿中所有工作表的名称"""
+    candidates = _candidates(file_path, backend)
+    for i, reader in enumerate(candidates):
+        try:
+            return reader.sheet_names(file_path)
+        except Exception:
+            if i == len(candidates) - 1:
+                raise
+
+
+def first_sheet_name(file_path, backend=None):
+    """返回工作簿第一个工作表的名称"""
+    return sheet_names(file_path, backend)[0]
+
+
+def iter_chunks(file_path, sheet_name=None, chunk_rows=CHUNK_ROWS, backend=None):
+    """
+    流式读取工作表，第一行作为表头，每次返回最多 chunk_rows 行数据组成的DataFrame
+    sheet_name: 工作表名称，为None时读取第一个工作表
+    backend: 指定读取后端（见 BACKENDS），为None时自动选择
+    """
+    reader, sheet_name, header, rows = _open_rows(file_path, sheet_name, backend)
+    if header is None:
+        return
+
+    chunk = []
+    yielded = False
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_rows:
+            yield _to_frame(header, chunk)
+            chunk = []
+            yielded = True
+    # 只有表头时也返回一个空DataFrame，保留列名
+    if chunk or not yielded:
+        yield _to_frame(header, chunk)
+
+
+def read_sheet(file_path, sheet_name=None, backend=None):
+    """读取整个工作表，用法同 pd.read_excel(file_path, sheet_name=sheet_name)"""
+    chunks = list(iter_chunks(file_path, sheet_name, backend=backend))
+    if not chunks:
+        return pd.DataFrame()
+    return pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
@@ -0,0 +1,112 @@
+"""
+流水线中间结果存储
+
+各阶段的中间结果不再写成Excel，而是把同一阶段的所有工作表纵向拼接后保存为一个Parquet文件，
+工作表名称、列名及列顺序记录在文件元数据中。只有在用户下载中间文件时才转换为Excel。
+"""
+import json
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from modules import excel_export
+
+INTERMEDIATE_EXT = '.parquet'
+
+# 拼接后用于区分工作表的列
+_SHEET_COL = '__sheet__'
+# 文件元数据中保存工作表信息的键
+_META_KEY = b'kqxt_sheets'
+# 既有数字又有文字的列（如"异常"与加班小时数混排），Parquet无法直接保存，按JSON逐个编码；
+# 分类类型的列（如数字与"kq_000"混排的员工ID）只编码各类别，读取后仍为分类类型
+_MIXED_TYPES = ('mixed', 'mixed-integer', 'mixed-integer-float')
+
+
+def _json_default(value):
+    # numpy标量转为Python原生类型，其余无法编码的值（如时间对象）按字符串保存
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+def _encode_value(value):
+    return json.dumps(value, ensure_ascii=False, default=_json_default)
+
+
+def _decode_value(value):
+    return None if value is None else json.loads(value)
+
+
+def save_sheets(path, sheets):
+    """将 {工作表名称: DataFrame} 保存为一个Parquet文件"""
+    columns = []
+    sheet_info = []
+    frames = []
+    for index, (sheet_name, df) in enumerate(sheets.items()):
+        sheet_info.append({'name': sheet_name, 'columns': list(df.columns)})
+        for col in df.columns:
+            if col not in columns:
+                columns.append(col)
+        frame = df.copy()
+        frame.columns = [str(col) for col in frame.columns]
+        frame[_SHEET_COL] = index
+        frames.append(frame)
+
+    if frames:
+        combined = pd.concat(frames, ignore_index=True)
+    else:
+        combined = pd.DataFrame({_SHEET_COL: pd.Series(dtype='int64')})
+
+    json_columns = []
+    for col in combined.columns:
+        series = combined[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            if pd.api.types.infer_dtype(series.cat.categories, skipna=True) in _MIXED_TYPES:
+                combined[col] = series.cat.rename_categories([_encode_value(v) for v in series.cat.categories])
+                json_columns.append(col)
+        elif series.dtype == object and pd.api.types.infer_dtype(series, skipna=True) in _MIXED_TYPES:
+            combined[col] = series.map(_encode_value)
+            json_columns.append(col)
+
+    table = pa.Table.from_pandas(combined, preserve_index=False)
+    meta = {'sheets': sheet_info, 'json_columns': json_columns}
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        _META_KEY: json.dumps(meta, ensure_ascii=False, default=str).encode('utf-8'),
+    })
+    pq.write_table(table, path)
+
+
+def load_sheets(path):
+    """读取 save_sheets 保存的Parquet文件，返回 {工作表名称: DataFrame}"""
+    table = pq.read_table(path)
+    meta = json.loads(table.schema.metadata[_META_KEY].decode('utf-8'))
+    combined = table.to_pandas()
+    for col in meta['json_columns']:
+        if isinstance(combined[col].dtype, pd.CategoricalDtype):
+            combined[col] = combined[col].cat.rename_categories(
+                [_decode_value(v) for v in combined[col].cat.categories])
+        else:
+            combined[col] = combined[col].map(_decode_value)
+
+    sheets = {}
+    for index, info in enumerate(meta['sheets']):
+        df = combined[combined[_SHEET_COL] == index]
+        df = df[[str(col) for col in info['columns']]].reset_index(drop=True)
+        df.columns = info['columns']
+        sheets[info['name']] = df
+    return sheets
+
+
+def export_xlsx(path, xlsx_path=None):
+    """将中间结果转换为Excel文件（仅在下载时调用），返回Excel文件路径"""
+    if xlsx_path is None:
+        xlsx_path = os.path.splitext(path)[0] + '.xlsx'
+    # 已转换且未过期时直接复用
+    if os.path.exists(xlsx_path) and os.path.getmtime(xlsx_path) >= os.path.getmtime(path):
+        return xlsx_path
+
+    excel_export.write_sheets(xlsx_path, load_sheets(path))
+    return xlsx_path
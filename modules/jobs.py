@@ -0,0 +1,109 @@
+"""
+后台处理任务队列
+
+提交的任务由固定数量的后台线程执行，调用方立即拿到任务ID，
+之后通过任务ID查询状态（queued / running / done / failed）和结果。
+每个任务可以有自己的工作目录（work_root/任务ID），多个任务并行时中间文件互不覆盖。
+"""
+import os
+import threading
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+
+def _now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+@dataclass
+class Job:
+    """单个后台任务的状态"""
+    id: str
+    status: str = JOB_QUEUED
+    created_at: str = field(default_factory=_now)
+    started_at: str = None
+    finished_at: str = None
+    result: dict = None
+    error: str = None
+    # 任务的独立工作目录（不对外返回）
+    work_dir: str = None
+    # 处理过程中各阶段的运行指标（modules.metrics.StageMetrics，见 /api/jobs/{id}/metrics）
+    metrics: object = None
+
+    def to_dict(self):
+        return {
+            'jobId': self.id,
+            'status': self.status,
+            'createdAt': self.created_at,
+            'startedAt': self.started_at,
+            'finishedAt': self.finished_at,
+            'result': self.result,
+            'error': self.error,
+        }
+
+
+class JobQueue:
+    """
+    有界的后台任务池
+    max_workers: 同时执行的任务数，超出的任务排队等待
+    work_root: 任务工作目录的根目录，为None时任务没有独立工作目录
+    """
+
+    def __init__(self, max_workers=1, work_root=None):
+        self.max_workers = max_workers
+        self.work_root = work_root
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='kqxt-job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args, **kwargs):
+        """
+        提交任务，立即返回Job
+        func 以Job本身为第一个参数调用（可通过 job.work_dir 取得工作目录），返回值（dict）保存为任务结果
+        """
+        job = Job(id=str(uuid.uuid4()))
+        if self.work_root is not None:
+            job.work_dir = os.path.join(self.work_root, job.id)
+        with self._lock:
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, func, args, kwargs)
+        return job
+
+    def add_done(self, result):
+        """登记一个无需执行、直接完成的任务（如命中结果缓存），返回Job"""
+        job = Job(id=str(uuid.uuid4()), status=JOB_DONE, result=result)
+        job.started_at = job.finished_at = job.created_at
+        with self._lock:
+            self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id):
+        """按任务ID查询任务，不存在时返回None"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def shutdown(self, wait=False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _run(self, job, func, args, kwargs):
+        job.status = JOB_RUNNING
+        job.started_at = _now()
+        try:
+            if job.work_dir is not None:
+                os.makedirs(job.work_dir, exist_ok=True)
+            job.result = func(job, *args, **kwargs)
+            job.status = JOB_DONE
+        except Exception as e:
+            traceback.print_exc()
+            job.error = f"处理失败: {str(e)}"
+            job.status = JOB_FAILED
+        finally:
+            job.finished_at = _now()
@@ -0,0 +1,177 @@
+"""
+流水线各阶段的运行指标
+
+每个阶段记录墙钟时间、CPU时间、进程内存峰值、输入/输出行数及跳过的工作表（天）数，
+同一阶段执行多次时（如按天处理）累加为一条记录：时间、行数累加，内存峰值取最大值。
+按天交给工作进程执行的阶段在工作进程中记录，结果随每天的处理结果返回后并入任务的记录。
+
+CPU时间为执行该阶段的线程的CPU时间（time.thread_time），多个任务在同一进程中并行时互不干扰。
+内存峰值为阶段执行期间进程内存占用的最大值：Linux 上阶段开始时把进程的峰值（/proc/self/status 的 VmHWM）
+重置为当前占用（向 /proc/self/clear_refs 写入 "5"），阶段结束时读取，常驻工作进程及API服务进程中
+之前任务留下的峰值不计入。同一进程中同时执行多个阶段时（如API服务并行的任务），只在没有其他阶段执行时重置，
+这些阶段记录的是其中最早开始的阶段以来的峰值（偏大而不会漏记）。
+无法重置峰值的系统上为进程启动以来的峰值（resource.getrusage 的 ru_maxrss）。
+"""
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+try:
+    import resource
+except ImportError:  # Windows 没有 resource 模块，不记录内存
+    resource = None
+
+# Linux 上进程的内存占用（VmRSS）、内存峰值（VmHWM），及重置峰值的文件
+_PROC_STATUS = '/proc/self/status'
+_PROC_CLEAR_REFS = '/proc/self/clear_refs'
+
+# 本进程中正在执行的阶段数（为0时才重置内存峰值）
+_active_stages = 0
+_active_lock = threading.Lock()
+
+
+def _proc_status_mb(key):
+    """/proc/self/status 中 key 一项的内存数值（MB），无法读取时为None"""
+    try:
+        with open(_PROC_STATUS) as f:
+            for line in f:
+                if line.startswith(key + ':'):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def reset_peak_rss():
+    """将本进程的内存峰值重置为当前占用（Linux），不支持时返回False"""
+    try:
+        with open(_PROC_CLEAR_REFS, 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+    """本进程的内存峰值（MB）：上次 reset_peak_rss 以来的最大值，没有重置过时为进程启动以来的最大值；无法获取时为0"""
+    peak = _proc_status_mb('VmHWM')
+    if peak is not None:
+        return peak
+    if resource is None:
+        return 0
+    # Linux 上 ru_maxrss 的单位是KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def current_rss_mb():
+    """本进程当前的内存占用（MB），无法获取时用 peak_rss_mb 代替"""
+    rss = _proc_status_mb('VmRSS')
+    return rss if rss is not None else peak_rss_mb()
+
+
+def _enter_stage():
+    global _active_stages
+    with _active_lock:
+        if _active_stages == 0:
+            reset_peak_rss()
+        _active_stages += 1
+
+
+def _exit_stage():
+    global _active_stages
+    with _active_lock:
+        _active_stages -= 1
+
+
+@dataclass
+class StageRecord:
+    """单个阶段的运行指标"""
+    stage: str
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    peak_rss_mb: float = 0.0
+    rows_in: int = 0
+    rows_out: int = 0
+    sheets_skipped: int = 0
+    # 该阶段执行的次数（按天处理时为处理的天数）
+    calls: int = 0
+
+    def merge(self, other):
+        self.wall_seconds += other.wall_seconds
+        self.cpu_seconds += other.cpu_seconds
+        self.peak_rss_mb = max(self.peak_rss_mb, other.peak_rss_mb)
+        self.rows_in += other.rows_in
+        self.rows_out += other.rows_out
+        self.sheets_skipped += other.sheets_skipped
+        self.calls += other.calls
+
+    def to_dict(self):
+        return {
+            'stage': self.stage,
+            'wallSeconds': round(self.wall_seconds, 3),
+            'cpuSeconds': round(self.cpu_seconds, 3),
+            'peakRssMb': round(self.peak_rss_mb, 1),
+            'rowsIn': self.rows_in,
+            'rowsOut': self.rows_out,
+            'sheetsSkipped': self.sheets_skipped,
+            'calls': self.calls,
+        }
+
+
+class StageMetrics:
+    """
+    一次处理任务的各阶段指标，按阶段第一次出现的顺序保存
+    用法：
+        with metrics.stage('4全班', rows_in=len(df)) as record:
+            ...
+            record.rows_out = len(result)
+    """
+
+    def __init__(self):
+        self._records = {}
+        # API服务在任务执行过程中读取指标
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name, rows_in=0):
+        """记录一次阶段执行，阶段内设置 record.rows_out、record.sheets_skipped（出错时同样记录）"""
+        record = StageRecord(stage=name, rows_in=rows_in, calls=1)
+        _enter_stage()
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield record
+        finally:
+            record.wall_seconds = time.perf_counter() - wall_start
+            record.cpu_seconds = time.thread_time() - cpu_start
+            record.peak_rss_mb = peak_rss_mb()
+            _exit_stage()
+            self.merge([record])
+
+    def merge(self, records):
+        """并入其他进程中记录的阶段指标（StageRecord 列表）"""
+        with self._lock:
+            for record in records:
+                self._records.setdefault(record.stage, StageRecord(stage=record.stage)).merge(record)
+
+    def records(self):
+        """各阶段指标（StageRecord 列表的副本）"""
+        with self._lock:
+            return [StageRecord(**vars(record)) for record in self._records.values()]
+
+    def to_dict(self):
+        records = self.records()
+        return {
+            'stages': [record.to_dict() for record in records],
+            'peakRssMb': round(max([record.peak_rss_mb for record in records], default=0), 1),
+        }
+
+    def format_table(self):
+        """各阶段指标的文本表格（命令行输出用）"""
+        lines = [f"{'阶段':<12}{'耗时(秒)':>10}{'CPU(秒)':>10}{'内存峰值(MB)':>14}"
+                 f"{'输入行数':>10}{'输出行数':>10}{'跳过':>6}{'次数':>6}"]
+        for r in self.records():
+            lines.append(f"{r.stage:<12}{r.wall_seconds:>10.3f}{r.cpu_seconds:>10.3f}{r.peak_rss_mb:>14.1f}"
+                         f"{r.rows_in:>10}{r.rows_out:>10}{r.sheets_skipped:>6}{r.calls:>6}")
+        return '\n'.join(lines)
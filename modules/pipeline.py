@@ -0,0 +1,556 @@
+"""
+Excel打卡数据处理流水线（进程内执行）
+
+依次调用 1分割 → 2时间预处理 → 3分列时间 → 4全班 → 66 → 6 各脚本中的处理函数，
+不再为每个脚本单独启动Python进程，也不再从磁盘重新读取上一阶段的Excel文件。
+2时间预处理 与 3分列时间 合并为一步（ingest）：打卡时间只拆分一次即得到四次打卡和班次，
+调试时可以逐个阶段执行（fused=False，命令行 --by-stage），两种方式的结果相同。
+录入后的长表按 schema.py 转换为统一的数据类型（打卡、班次、结果文字为分类类型）。
+4全班 与 66 合并为一步：夜班补贴时长在全班次处理时由下班卡时间直接计算。
+原始月报先整理为一张长表（日期、员工、打卡时间），之后各阶段都处理这一张表，
+只有最后的统计按日期分组生成每日统计。
+第2～6阶段对每一天的记录相互独立，可以按天分配到多个工作进程并行处理（workers 参数，
+或由API服务、Streamlit应用传入常驻的工作进程池，见 worker_pool.py），
+各天的结果按日期顺序合并，与顺序处理的结果完全相同。
+传入按天缓存（result_cache.DayCache）时，每天的记录先计算指纹，内容未变化的日期直接复用缓存的结果，
+只处理新增或修改过的日期，月中多次上传累计的月报时只需处理新增的几天。
+补充导出的部分日期可以用 append_days 并入已处理的结果目录：只处理补充文件中的日期，
+其余日期沿用目录中保存的中间结果和每日统计，再重新生成总汇总。
+中间结果以Parquet格式保存（见 intermediate.py），只有最终的汇总统计写成Excel。
+"""
+import argparse
+import hashlib
+import importlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+# 直接运行本脚本时，将项目根目录加入搜索路径以便导入 modules 包
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from modules import intermediate, schema, shift_engine
+from modules.metrics import StageMetrics
+from modules.result_cache import DAILY_SUMMARY_NAME, DayCache
+
+# 脚本文件名以数字开头，只能通过importlib导入
+split_stage = importlib.import_module('modules.1分割')
+preprocess_stage = importlib.import_module('modules.2时间预处理')
+column_stage = importlib.import_module('modules.3分列时间')
+shift_stage = importlib.import_module('modules.4全班')
+summary_stage = importlib.import_module('modules.6')
+
+# 处理逻辑版本，修改各阶段的计算方式时递增；与班次规则版本一起标识结果（用作结果缓存的键）
+PIPELINE_VERSION = 5
+RULE_VERSION = f"{PIPELINE_VERSION}.{shift_engine.RULE_VERSION}"
+
+# 默认临时目录（与各脚本中的 ../temp_files 保持一致）
+TEMP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'temp_files')
+
+# 各阶段中间结果名称（与原脚本输出文件名保持一致，扩展名见 intermediate.INTERMEDIATE_EXT）
+SPLIT_NAME = '按日期分表的打卡数据'
+PREPROCESS_NAME = '按日期分表的处理打卡数据'
+COLUMN_NAME = '按打卡时间分列的打卡数据'
+SHIFT_NAME = '全班次处理后的打卡数据'
+SUBSIDY_NAME = '员工打卡记录_带补贴时长'
+# 按天处理阶段的中间结果（按此顺序保存）
+DAY_STAGE_NAMES = [PREPROCESS_NAME, COLUMN_NAME, SHIFT_NAME, SUBSIDY_NAME]
+# 最终结果文件
+SUMMARY_FILE = '打卡数据汇总统计.xlsx'
+# 按天处理阶段（第2～6阶段）的默认工作进程数，1表示在当前进程内顺序处理
+DEFAULT_WORKERS = 1
+
+# 运行指标中的阶段名称（见 metrics.py）
+STAGE_SPLIT = '1分割'
+STAGE_INGEST = '2~3合并录入'
+STAGE_PREPROCESS = '2时间预处理'
+STAGE_COLUMN = '3分列时间'
+STAGE_SHIFT = '4全班'
+STAGE_DAILY = '6每日统计'
+STAGE_TOTAL = '6总汇总'
+STAGE_WRITE = '写入汇总文件'
+STAGE_SAVE = '保存中间结果'
+STAGE_CACHE = '按天缓存'
+STAGE_LOAD = '读取已有结果'
+STAGE_MERGE = '合并已有结果'
+
+# 写入Excel再读回时会变成空值的字符串（pandas默认的空值标记）
+_BLANK_STRINGS = ['', 'nan', 'None']
+
+
+@dataclass
+class PipelineResult:
+    """流水线执行结果"""
+    output_path: str
+    daily_summaries: dict = field(default_factory=dict)
+    total_summary: pd.DataFrame = None
+    intermediate_files: list = field(default_factory=list)
+    # 处理的天数，其中直接复用按天缓存结果的天数
+    day_count: int = 0
+    reused_days: int = 0
+    # 各阶段的运行指标
+    metrics: StageMetrics = None
+
+
+def _handoff(df):
+    """阶段间传递数据时，按原来经Excel读写后的结果将空白字符串还原为空值"""
+    return df.mask(df.isin(_BLANK_STRINGS))
+
+
+def ingest(df, keep_preprocessed=False):
+    """
+    合并执行第2、3阶段：由第1阶段的长表直接得到四次打卡分列、并推断了班次的长表（第4阶段的输入）
+    结果与依次执行两个阶段（及阶段间的空值还原）相同，但打卡时间只拆分一次：
+    需要精简的行直接由保留的打卡时间填入四列，不再拼成字符串后重新拆分；整表的空值还原只执行一次
+    结果按 schema 一次性转换为统一的数据类型（打卡、班次为分类类型），之后各阶段直接使用
+    keep_preprocessed: 为True时同时返回第2阶段的结果（精简后的打卡时间，用于保存中间结果）
+    返回 (第3阶段的长表, 第2阶段的长表或None)
+    """
+    df = _handoff(df)
+    punches = df['打卡时间']
+    punch_times = column_stage.split_punches(punches)
+
+    # 超过4次的打卡按第2阶段的规则精简，保留的打卡时间依次填入四列
+    mask = (punches.notna() & (punches.astype(str).str.strip() != '')).to_numpy()
+    positions = np.flatnonzero(mask)
+    rows, parts = preprocess_stage.reduce_punches(punches.iloc[positions])
+    rows = positions[rows]
+    if len(rows):
+        kept = np.column_stack(parts)
+        # 每行保留的打卡时间靠左排列，缺少的列为空
+        order = np.argsort(kept == '', axis=1, kind='stable')
+        punch_times.iloc[rows, :] = np.take_along_axis(kept, order, axis=1)
+
+    preprocessed = None
+    if keep_preprocessed:
+        preprocessed = df.copy()
+        if len(rows):
+            preprocessed.iloc[rows, preprocessed.columns.get_loc('打卡时间')] = preprocess_stage.pack_punches(parts)
+
+    shifts = column_stage.infer_shifts(df[['部门']].join(punch_times[['第一次打卡']]))
+    result = column_stage.join_punch_columns(df, punch_times, shifts)
+    # 新增的列按第4阶段读入时的方式还原空值（其余列已在开始时还原）
+    new_cols = ['班次'] + column_stage.PUNCH_COLS
+    result[new_cols] = _handoff(result[new_cols])
+    return schema.to_canonical(result), preprocessed
+
+
+def process_days(df, tm, keep_intermediates=True, save=None, fused=True, metrics=None):
+    """
+    对长表中若干天的记录执行第2～5阶段，并生成这些天的每日统计
+    可以在工作进程中执行；各天之间互不依赖，分开处理与整表处理的结果相同
+    save: 每个阶段完成后以 (中间结果名称, 长表) 调用，为None时中间结果随返回值返回
+    fused: 为True时第2、3阶段合并执行（见 ingest），为False时逐个阶段执行（用于调试、核对）
+    metrics: 记录各阶段运行指标的 StageMetrics，为None时不保留
+    返回 ({中间结果名称: 该阶段处理后的长表}, {每日工作表名称: 每日统计})，
+    keep_intermediates 为False或指定了 save 时不返回中间结果
+    """
+    stages = {}
+    keeping = save is not None or keep_intermediates
+    if metrics is None:
+        metrics = StageMetrics()
+
+    def keep(name, df):
+        if save is not None:
+            save(name, df)
+        elif keep_intermediates:
+            stages[name] = df
+
+    if fused:
+        # 2～3. 打卡时间预处理、分列并推断班次
+        with metrics.stage(STAGE_INGEST, rows_in=len(df)) as record:
+            df, preprocessed = ingest(df, keep_preprocessed=keeping)
+            record.rows_out = len(df)
+        if keeping:
+            keep(PREPROCESS_NAME, preprocessed)
+            keep(COLUMN_NAME, df)
+    else:
+        # 2. 打卡时间预处理
+        with metrics.stage(STAGE_PREPROCESS, rows_in=len(df)) as record:
+            df = preprocess_stage.process_sheet(_handoff(df))
+            record.rows_out = len(df)
+        keep(PREPROCESS_NAME, df)
+
+        # 3. 打卡时间分列并推断班次
+        with metrics.stage(STAGE_COLUMN, rows_in=len(df)) as record:
+            df = column_stage.split_punch_columns(_handoff(df))
+            record.rows_out = len(df)
+        keep(COLUMN_NAME, df)
+
+    # 4. 全班次处理，同时由下班卡时间计算夜班补贴时长（即第5阶段 66.py 的结果）
+    # （合并执行时 ingest 的结果已还原过空值；第4阶段在输入上添加结果列，保留第3阶段结果时先复制）
+    with metrics.stage(STAGE_SHIFT, rows_in=len(df)) as record:
+        if not fused:
+            df = _handoff(df)
+        elif keeping:
+            df = df.copy()
+        df = shift_stage.process_sheet(df, subsidy=True)
+        record.rows_out = len(df)
+    if keeping:
+        keep(SHIFT_NAME, df.drop(columns=[shift_engine.SUBSIDY_COL]))
+    keep(SUBSIDY_NAME, df)
+
+    # 6. 每日统计（缺少必要列的日期跳过）
+    with metrics.stage(STAGE_DAILY, rows_in=len(df)) as record:
+        daily_summaries = summary_stage.summarize_by_date(_handoff(df), tm)
+        record.rows_out = sum(len(summary) for summary in daily_summaries.values())
+        record.sheets_skipped = df['日期'].nunique() - len(daily_summaries)
+    return stages, daily_summaries
+
+
+def _measured_process_days(df, tm, keep_intermediates, save, fused):
+    """在工作进程中执行 process_days，同时返回各阶段的运行指标（StageRecord 列表）"""
+    metrics = StageMetrics()
+    return process_days(df, tm, keep_intermediates, save, fused, metrics), metrics.records()
+
+
+def _split_days(df):
+    """按日期将长表拆分为每天一段（按日期排序），每段的行号从0开始"""
+    return [day_df.reset_index(drop=True) for _, day_df in df.groupby('日期', sort=True)]
+
+
+def _day_of_month(dates):
+    """日期列的日号（没有月份时日期列本身即为日号）"""
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        dates = dates.dt.day
+    return dates.astype(split_stage.DAY_DTYPE)
+
+
+def fingerprint_day(day_df, tm):
+    """
+    一天长表记录的指纹（由列名、记录内容及工作表名称计算），内容不变时指纹不变
+    日期列只计日号：月份由工作表名称、文件名或调用方确定，同一份累计月报在月份不同时
+    （如跨月后才上传的月末文件）仍复用缓存，复用时结果中的日期换成本次的日期
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps([tm, [str(col) for col in day_df.columns]], ensure_ascii=False).encode('utf-8'))
+    # 按值计算哈希，与分类编码无关（不同上传文件中员工的分类编码可能不同）
+    day_df = day_df.assign(日期=_day_of_month(day_df['日期']))
+    digest.update(pd.util.hash_pandas_object(day_df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _align_cached(df, dtypes, date=None):
+    """
+    缓存中读出的结果按本次长表的分类类型转换员工信息列，合并后与重新处理的结果类型相同；
+    指定 date 时日期列换成本次的日期（缓存的结果可能来自月份不同的处理）
+    """
+    for col, dtype in dtypes.items():
+        if col in df.columns and df[col].dtype != dtype:
+            df[col] = df[col].astype(dtype)
+    if date is not None:
+        df['日期'] = date
+    return df
+
+
+def _process_cached_days(days, tm, day_cache, map_days, metrics):
+    """
+    按天缓存：复用内容未变化的日期的结果，其余日期用 map_days 处理后写入缓存
+    返回 (按日期顺序的各天结果, 复用缓存的天数)
+    """
+    dtypes = {col: dtype for col, dtype in days[0].dtypes.items() if isinstance(dtype, pd.CategoricalDtype)}
+    parts = []
+    # 查找缓存：输入为所有日期的行数，输出为复用缓存的行数，跳过数为复用缓存、不再处理的天数
+    with metrics.stage(STAGE_CACHE, rows_in=sum(len(day_df) for day_df in days)) as record:
+        fingerprints = [fingerprint_day(day_df, tm) for day_df in days]
+        for day_df, fingerprint in zip(days, fingerprints):
+            cached = day_cache.get_day(fingerprint, RULE_VERSION)
+            if cached is not None:
+                stages, daily_summaries = cached
+                # 每日统计的日期列为工作表名称（只含日号），不需要替换
+                date = day_df['日期'].iloc[0]
+                cached = ({name: _align_cached(df, dtypes, date) for name, df in stages.items()},
+                          {sheet: _align_cached(df, dtypes) for sheet, df in daily_summaries.items()})
+                record.rows_out += len(day_df)
+                record.sheets_skipped += 1
+            parts.append(cached)
+
+    # 缓存中的结果总是包含各阶段的中间结果
+    todo = [i for i, part in enumerate(parts) if part is None]
+    computed = map_days([days[i] for i in todo], [tm] * len(todo), [True] * len(todo)) if todo else []
+    for i, part in zip(todo, computed):
+        with metrics.stage(STAGE_CACHE):
+            day_cache.put_day(fingerprints[i], RULE_VERSION, *part)
+        parts[i] = part
+    return parts, len(days) - len(todo)
+
+
+def _run_days(days, tm, keep_intermediates, workers, pool, day_cache, metrics, fused=True):
+    """
+    执行各天的第2～6阶段，返回 (按日期顺序的各天结果, 复用缓存的天数)
+    pool 或 workers 指定时每天作为一个任务交给工作进程，day_cache 指定时只处理缓存中没有的日期
+    各天各阶段的运行指标并入 metrics
+    """
+    def map_days(*args):
+        args += ([None] * len(args[0]), [fused] * len(args[0]))
+        if pool is not None:
+            outputs = pool.map(_measured_process_days, *args)
+        elif workers > 1 and len(args[0]) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(args[0]))) as executor:
+                outputs = list(executor.map(_measured_process_days, *args))
+        else:
+            outputs = list(map(_measured_process_days, *args))
+        for _, records in outputs:
+            metrics.merge(records)
+        return [part for part, _ in outputs]
+
+    if day_cache is not None and days:
+        parts, reused_days = _process_cached_days(days, tm, day_cache, map_days, metrics)
+        print(f"共 {len(days)} 天，复用缓存结果 {reused_days} 天，重新处理 {len(days) - reused_days} 天")
+        return parts, reused_days
+    return map_days(days, [tm] * len(days), [keep_intermediates] * len(days)), 0
+
+
+def _save_intermediate(result, output_dir, name, sheets):
+    """将中间结果 {工作表名称: DataFrame} 保存为 output_dir 下的 "名称.parquet" """
+    path = os.path.join(output_dir, name + intermediate.INTERMEDIATE_EXT)
+    rows = sum(len(df) for df in sheets.values())
+    with result.metrics.stage(STAGE_SAVE, rows_in=rows) as record:
+        intermediate.save_sheets(path, sheets)
+        record.rows_out = rows
+    result.intermediate_files.append(path)
+
+
+def _count_rows(chunks, record):
+    """逐段传递读取的打卡矩阵，同时把行数（员工数）计入 record.rows_in"""
+    for chunk in chunks:
+        record.rows_in += len(chunk)
+        yield chunk
+
+
+def _write_total(result):
+    """由每日统计生成总汇总，与每日统计一起写入汇总文件"""
+    daily_rows = sum(len(df) for df in result.daily_summaries.values())
+    with result.metrics.stage(STAGE_TOTAL, rows_in=daily_rows) as record:
+        if result.daily_summaries:
+            result.total_summary = summary_stage.summarize_total(list(result.daily_summaries.values()))
+            record.rows_out = len(result.total_summary)
+    total_rows = 0 if result.total_summary is None else len(result.total_summary)
+    with result.metrics.stage(STAGE_WRITE, rows_in=daily_rows + total_rows) as record:
+        summary_stage.write_summary(result.output_path, result.daily_summaries, result.total_summary)
+        record.rows_out = daily_rows + total_rows
+
+
+def run_pipeline(input_path, output_dir=TEMP_DIR, keep_intermediates=True, month=None, workers=DEFAULT_WORKERS,
+                 pool=None, day_cache=None, fused=True, metrics=None, source_name=None):
+    """
+    执行完整的打卡数据处理流程
+    input_path: 原始月报Excel文件路径
+    output_dir: 结果文件（及中间文件）的保存目录
+    keep_intermediates: 是否保存各阶段的中间结果（Parquet格式）
+    month: 月报对应的月份（如"2025-09"），为None时从工作表名称或文件名中识别，都识别不到时日期列为日号
+    workers: 按天并行处理的工作进程数，1表示在当前进程内顺序处理
+    pool: 常驻的工作进程池（worker_pool.WorkerPool），指定时按天交给其中的进程处理，忽略 workers
+    day_cache: 按天缓存（result_cache.DayCache），指定时只处理缓存中没有的日期
+    fused: 为False时逐个阶段执行第2、3阶段（调试用，见 process_days）
+    metrics: 记录各阶段运行指标的 StageMetrics（处理过程中即可读取），为None时新建，保存在返回结果的 metrics 中
+    source_name: 上传时的原始文件名（用于识别月份），为None时使用 input_path 的文件名
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    result = PipelineResult(output_path=os.path.join(output_dir, SUMMARY_FILE),
+                            metrics=StageMetrics() if metrics is None else metrics)
+
+    def save(name, df):
+        if keep_intermediates:
+            _save_intermediate(result, output_dir, name, {tm: df})
+
+    # 1. 将月度打卡矩阵整理为长表（每行为一名员工一天的记录）
+    with result.metrics.stage(STAGE_SPLIT) as record:
+        tm, chunks = split_stage.read_original_chunks(input_path)
+        if month is None:
+            month = split_stage.detect_month(tm) or split_stage.detect_month(
+                source_name or os.path.basename(input_path))
+        df = split_stage.normalize_chunks(_count_rows(chunks, record), tm, month)
+        record.rows_out = len(df)
+    save(SPLIT_NAME, df)
+
+    # 2～6. 按天处理，多进程时每天作为一个任务，结果按日期顺序合并
+    if pool is not None or workers > 1 or day_cache is not None:
+        days = _split_days(df)
+        del df
+        result.day_count = len(days)
+        parts, result.reused_days = _run_days(days, tm, keep_intermediates, workers, pool, day_cache,
+                                              result.metrics, fused)
+        del days
+        if keep_intermediates and parts:
+            for name in DAY_STAGE_NAMES:
+                save(name, _concat_frames([stages[name] for stages, _ in parts]))
+    else:
+        result.day_count = df['日期'].nunique()
+        parts = [process_days(df, tm, keep_intermediates, save, fused, result.metrics)]
+        del df
+
+    for _, daily_summaries in parts:
+        result.daily_summaries.update(daily_summaries)
+
+    # 每日统计另存一份（追加日期时由此重新生成总汇总）
+    if keep_intermediates:
+        _save_intermediate(result, output_dir, DAILY_SUMMARY_NAME, result.daily_summaries)
+
+    # 总汇总
+    _write_total(result)
+
+    print(f"处理完成！结果已保存到 {result.output_path}")
+    return result
+
+
+def _concat_frames(frames):
+    """
+    合并若干长表（行号重新编号），保留分类类型：
+    各部分类别不同的分类列（员工信息、打卡等按取值确定类别的列）先统一为各部分类别的并集再合并，
+    其他部分中全空、不是分类类型的同一列（如Parquet读回的全空列）也先转换为该类型；
+    部分为分类类型、部分是有取值的其他类型的列合并后为字符串，重新转换：
+    员工信息列、打卡列按合并后的取值，其余（类别固定的班次、结果文字列）沿用分类部分的类型
+    """
+    dtypes = {}
+    for col in frames[-1].columns:
+        parts = [df[col] for df in frames if col in df.columns]
+        cat_dtypes = [part.dtype for part in parts if isinstance(part.dtype, pd.CategoricalDtype)]
+        if not cat_dtypes or all(part.dtype == cat_dtypes[0] for part in parts):
+            continue
+        if any(not isinstance(part.dtype, pd.CategoricalDtype) and part.notna().any() for part in parts):
+            continue
+        categories = cat_dtypes[0].categories
+        for d in cat_dtypes[1:]:
+            if not d.categories.equals(categories):
+                categories = categories.union(d.categories)
+        dtypes[col] = pd.CategoricalDtype(categories)
+    if dtypes:
+        frames = [df.astype({col: dtype for col, dtype in dtypes.items() if col in df.columns}) for df in frames]
+    merged = pd.concat(frames, ignore_index=True)
+    for col in merged.columns:
+        col_dtypes = [df[col].dtype for df in frames
+                      if col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype)]
+        if col_dtypes and not isinstance(merged[col].dtype, pd.CategoricalDtype):
+            by_value = col in split_stage.EMPLOYEE_COLS or col in schema.PUNCH_COLS
+            merged[col] = merged[col].astype('category' if by_value else col_dtypes[-1])
+    return merged
+
+
+def _merge_days(old_df, new_df, dates):
+    """用 new_df 替换 old_df 中 dates 这些日期的记录，按日期排序"""
+    merged = _concat_frames([old_df[~old_df['日期'].isin(dates)], new_df])
+    return merged.sort_values('日期', kind='stable', ignore_index=True)
+
+
+def append_days(input_path, base_dir, output_dir=None, workers=DEFAULT_WORKERS, pool=None, day_cache=None,
+                metrics=None):
+    """
+    将补充导出的部分日期并入已处理的结果（run_pipeline 保存了中间结果的目录）
+    input_path: 补充的月报Excel文件，处理其中有打卡记录或原结果中没有的日期，这些日期原有的结果被替换
+    base_dir: 已处理结果所在的目录，从中读取各阶段的中间结果和每日统计
+    output_dir: 合并后的结果（汇总统计及中间结果）的保存目录，为None时写回 base_dir
+    metrics: 记录各阶段运行指标的 StageMetrics，为None时新建
+    返回 PipelineResult，day_count 为本次处理的天数
+    """
+    if output_dir is None:
+        output_dir = base_dir
+    names = [SPLIT_NAME] + DAY_STAGE_NAMES + [DAILY_SUMMARY_NAME]
+    paths = {name: os.path.join(base_dir, name + intermediate.INTERMEDIATE_EXT) for name in names}
+    missing = [name for name, path in paths.items() if not os.path.exists(path)]
+    if missing:
+        raise FileNotFoundError(f"已处理的结果中缺少中间结果 {missing}，无法追加")
+
+    result = PipelineResult(output_path=os.path.join(output_dir, SUMMARY_FILE),
+                            metrics=StageMetrics() if metrics is None else metrics)
+
+    # 月份和工作表名称沿用已处理的结果
+    with result.metrics.stage(STAGE_LOAD) as record:
+        (tm, old_split), = intermediate.load_sheets(paths[SPLIT_NAME]).items()
+        record.rows_out = len(old_split)
+    if old_split.empty:
+        raise ValueError("已处理的结果中没有打卡记录，无法追加")
+    # 原结果没有月份时日期列为日号，补充文件同样按日号整理（沿用的工作表名称中识别不到月份）
+    old_dates = old_split['日期']
+    month = pd.Period(old_dates.iloc[0], freq='M') if pd.api.types.is_datetime64_any_dtype(old_dates) else None
+
+    # 1. 整理补充文件：有打卡记录的日期替换原有结果，原结果中没有的日期直接加入；
+    #    原结果中已有、补充文件中整列为空的日期不处理（避免空列覆盖已有的结果）
+    with result.metrics.stage(STAGE_SPLIT) as record:
+        _, chunks = split_stage.read_original_chunks(input_path)
+        df = split_stage.normalize_chunks(_count_rows(chunks, record), tm, month)
+        punches = df['打卡时间']
+        has_punch = punches.notna() & (punches.astype(str).str.strip() != '')
+        dates = set(df.loc[has_punch, '日期']) | (set(df['日期']) - set(old_split['日期']))
+        # 整列为空、沿用原有结果的日期计为跳过
+        record.sheets_skipped = df['日期'].nunique() - len(dates)
+        df = df[df['日期'].isin(dates)].reset_index(drop=True)
+        record.rows_out = len(df)
+    if not dates:
+        raise ValueError("补充文件中没有需要追加的日期")
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    def save(name, merged):
+        _save_intermediate(result, output_dir, name, {tm: merged})
+
+    def merge(old_df, new_df):
+        with result.metrics.stage(STAGE_MERGE, rows_in=len(old_df) + len(new_df)) as record:
+            merged = _merge_days(old_df, new_df, dates)
+            record.rows_out = len(merged)
+        return merged
+
+    merged = merge(old_split, df)
+    all_dates = merged['日期'].drop_duplicates().tolist()
+    save(SPLIT_NAME, merged)
+    del old_split, merged
+
+    # 2～6. 只处理补充的日期
+    days = _split_days(df)
+    del df
+    result.day_count = len(days)
+    parts, result.reused_days = _run_days(days, tm, True, workers, pool, day_cache, result.metrics)
+    del days
+    for name in DAY_STAGE_NAMES:
+        with result.metrics.stage(STAGE_LOAD) as record:
+            (_, old_df), = intermediate.load_sheets(paths[name]).items()
+            record.rows_out = len(old_df)
+        save(name, merge(old_df, _concat_frames([stages[name] for stages, _ in parts])))
+        del old_df
+
+    # 每日统计：补充的日期使用新结果，其余沿用原有结果，按日期排序
+    with result.metrics.stage(STAGE_LOAD) as record:
+        daily_summaries = intermediate.load_sheets(paths[DAILY_SUMMARY_NAME])
+        record.rows_out = sum(len(df) for df in daily_summaries.values())
+    with result.metrics.stage(STAGE_MERGE, rows_in=record.rows_out) as record:
+        for date in dates:
+            daily_summaries.pop(summary_stage.day_sheet_name(tm, date), None)
+        for _, new_summaries in parts:
+            daily_summaries.update(new_summaries)
+        for date in all_dates:
+            sheet = summary_stage.day_sheet_name(tm, date)
+            if sheet in daily_summaries:
+                result.daily_summaries[sheet] = daily_summaries[sheet]
+        record.rows_out = sum(len(df) for df in result.daily_summaries.values())
+    _save_intermediate(result, output_dir, DAILY_SUMMARY_NAME, result.daily_summaries)
+
+    # 由每日统计重新生成总汇总
+    _write_total(result)
+
+    print(f"追加完成！处理了 {result.day_count} 天，结果已保存到 {result.output_path}")
+    return result
+
+
+if __name__ == "__main__":
+    # 用法：python pipeline.py 原始文件 [输出目录] [--workers 进程数] [--month 2025-09] [--day-cache] [--append]
+    #       [--by-stage]
+    parser = argparse.ArgumentParser(description='Excel打卡数据处理流水线')
+    parser.add_argument('input_path', help='原始月报Excel文件路径')
+    parser.add_argument('output_dir', nargs='?', default=TEMP_DIR, help='结果文件的保存目录')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help='按天并行处理的工作进程数')
+    parser.add_argument('--month', default=None, help='月报对应的月份，如 2025-09')
+    parser.add_argument('--day-cache', action='store_true', help='使用按天缓存，只处理新增或修改过的日期')
+    parser.add_argument('--append', action='store_true', help='将补充文件中的日期并入输出目录中已处理的结果')
+    parser.add_argument('--by-stage', action='store_true', help='逐个阶段执行第2、3阶段（调试用）')
+    args = parser.parse_args()
+    day_cache = DayCache() if args.day_cache else None
+    if args.append:
+        result = append_days(args.input_path, args.output_dir, workers=args.workers, day_cache=day_cache)
+    else:
+        result = run_pipeline(args.input_path, args.output_dir, month=args.month, workers=args.workers,
+                              day_cache=day_cache, fused=not args.by_stage)
+    print(result.metrics.format_table())
@@ -0,0 +1,77 @@
+"""
+Excel读取后端性能测试
+
+生成一份模拟的月度打卡原始文件（员工数 × 天数的打卡矩阵，另存一份CSV），
+用 excel_reader 的每个可用后端完整读取一遍，输出各后端每秒读取的行数。
+
+用法：python reader_benchmark.py [员工数] [重复次数]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+# 直接运行本脚本时，将项目根目录加入搜索路径以便导入 modules 包
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from modules import excel_export, excel_reader
+
+SHEET_NAME = '上下班打卡_月报'
+DEPARTMENTS = ['生产部', '品质部', '技术部', '后勤部']
+
+
+def _punch_text(rng):
+    """随机生成一天的打卡记录（如 "07:58;12:01;13:02;18:35"），约一成为空（未打卡）"""
+    if rng.random() < 0.1:
+        return None
+    minutes = sorted(rng.sample(range(6 * 60, 23 * 60), rng.randint(1, 4)))
+    return ';'.join(f"{m // 60:02d}:{m % 60:02d}" for m in minutes)
+
+
+def make_workbook(path, employees=2000, days=31, seed=0):
+    """生成模拟的原始打卡文件（与考勤系统导出的月报格式相同），同时写一份同名CSV，返回两个路径"""
+    rng = random.Random(seed)
+    df = pd.DataFrame({
+        '姓名': [f'员工{i}' for i in range(employees)],
+        '员工ID': [f'kq_{i:05d}' for i in range(employees)],
+        '部门': [rng.choice(DEPARTMENTS) for _ in range(employees)],
+    })
+    for day in range(1, days + 1):
+        df[day] = [_punch_text(rng) for _ in range(employees)]
+
+    excel_export.write_sheets(path, {SHEET_NAME: df})
+    csv_path = os.path.splitext(path)[0] + '.csv'
+    df.to_csv(csv_path, index=False, encoding='utf-8-sig')
+    return path, csv_path
+
+
+def benchmark(file_path, backend, repeat=3):
+    """用指定后端完整读取文件 repeat 次，返回 (行数, 最快一次的秒数)"""
+    best = None
+    rows = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = sum(len(chunk) for chunk in excel_reader.iter_chunks(file_path, backend=backend))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return rows, best
+
+
+if __name__ == "__main__":
+    employees = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        xlsx_path, csv_path = make_workbook(os.path.join(tmp_dir, '原始文件.xlsx'), employees)
+        print(f"模拟打卡文件：{employees} 名员工 × 31 天，每个后端读取 {repeat} 次取最快一次")
+        print(f"{'文件':<6}{'后端':<10}{'行数':>8}{'耗时(秒)':>10}{'行/秒':>12}")
+        for file_path in (xlsx_path, csv_path):
+            ext = os.path.splitext(file_path)[1]
+            for backend in excel_reader.available_backends(file_path):
+                rows, seconds = benchmark(file_path, backend, repeat)
+                print(f"{ext:<6}{backend:<10}{rows:>8}{seconds:>10.3f}{rows / seconds:>12.0f}")
+        print(f"自动选择的后端：xlsx → {excel_reader.available_backends(xlsx_path)[0]}，"
+              f"csv → {excel_reader.available_backends(csv_path)[0]}")
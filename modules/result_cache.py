@@ -0,0 +1,180 @@
+"""
+处理结果缓存
+
+同一份原始文件（按内容哈希识别）在同一规则版本下重复处理时，直接返回上次的汇总结果。
+缓存按 "内容哈希-规则版本" 为键保存在磁盘上，总大小超过上限时按最近使用时间淘汰最旧的结果（LRU）；
+指定了月份（或从文件名中识别到月份）时月份也是键的一部分（见 content_key），月份不同时结果中的日期不同。
+
+DayCache 按天缓存流水线第2～6阶段的结果：键为一天打卡记录的指纹，月中多次上传累计的月报时，
+内容未变化的日期直接复用上次的结果，只重新处理新增或修改过的日期。
+
+淘汰结果时调用 on_evict 回调，调用方可以清除仍指向被淘汰文件的引用（如API服务中可下载的文件ID）。
+
+同一缓存目录可能同时被多个进程（API服务、Streamlit应用）写入，实例内的锁只能保证同一进程内的顺序：
+写入时先写到临时文件（目录）再改名，同一结果已被其他进程写入时按写入成功处理；
+淘汰时其他进程刚删除的结果直接跳过。
+"""
+import os
+import shutil
+import threading
+
+from modules import intermediate
+
+# 默认缓存目录及大小上限
+RESULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'cache', 'results')
+MAX_CACHE_BYTES = 512 * 1024 * 1024
+DAY_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'cache', 'days')
+MAX_DAY_CACHE_BYTES = 1024 * 1024 * 1024
+
+# 按天缓存中保存每日统计的文件名（其余文件为各阶段的处理结果，文件名即阶段名称）
+DAILY_SUMMARY_NAME = '每日统计'
+# 写入中的临时文件（目录）的后缀，淘汰时不计入
+TMP_SUFFIX = '.tmp'
+
+
+def content_key(content_hash, month=None):
+    """结果缓存中原始文件的键：内容哈希，指定月份时再加上月份"""
+    return content_hash if month is None else f"{content_hash}.{month}"
+
+
+def _tmp_name(path):
+    """path 对应的临时文件（目录）名称，不同进程、线程互不相同"""
+    return f"{path}.{os.getpid()}.{threading.get_ident()}{TMP_SUFFIX}"
+
+
+class ResultCache:
+    """
+    磁盘上的LRU结果缓存，每个结果保存为 cache_dir/键/文件名
+    max_bytes: 缓存总大小上限（字节）
+    on_evict: 淘汰一个结果后以该结果的目录为参数调用，为None时不调用
+    """
+
+    def __init__(self, cache_dir=RESULT_CACHE_DIR, max_bytes=MAX_CACHE_BYTES, on_evict=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self._lock = threading.Lock()
+
+    def _entry_dir(self, content_hash, rule_version):
+        return os.path.join(self.cache_dir, f"{content_hash}-{rule_version}")
+
+    def get(self, content_hash, rule_version):
+        """查找缓存的结果文件，命中时更新其使用时间并返回路径，未命中返回None"""
+        entry_dir = self._entry_dir(content_hash, rule_version)
+        with self._lock:
+            try:
+                filenames = os.listdir(entry_dir)
+            except OSError:
+                return None
+            if not filenames:
+                return None
+            cached_path = os.path.join(entry_dir, filenames[0])
+            try:
+                os.utime(cached_path)
+            except OSError:
+                # 刚被其他进程淘汰
+                return None
+            return cached_path
+
+    def put(self, content_hash, rule_version, file_path):
+        """将结果文件复制到缓存中，返回缓存文件路径；超过大小上限时淘汰最久未使用的结果"""
+        entry_dir = self._entry_dir(content_hash, rule_version)
+        cached_path = os.path.join(entry_dir, os.path.basename(file_path))
+        with self._lock:
+            os.makedirs(entry_dir, exist_ok=True)
+            tmp_path = _tmp_name(cached_path)
+            shutil.copyfile(file_path, tmp_path)
+            os.replace(tmp_path, cached_path)
+            self._evict(keep=entry_dir)
+        return cached_path
+
+    def _evict(self, keep=None):
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            entry_dir = os.path.join(self.cache_dir, name)
+            if name.endswith(TMP_SUFFIX) or not os.path.isdir(entry_dir):
+                continue
+            size = 0
+            last_used = 0
+            try:
+                for filename in os.listdir(entry_dir):
+                    stat = os.stat(os.path.join(entry_dir, filename))
+                    size += stat.st_size
+                    last_used = max(last_used, stat.st_mtime)
+            except FileNotFoundError:
+                # 已被其他进程淘汰
+                continue
+            entries.append((last_used, size, entry_dir))
+            total += size
+
+        # 从最久未使用的结果开始删除，刚写入的结果保留
+        for last_used, size, entry_dir in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if entry_dir == keep:
+                continue
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total -= size
+            if self.on_evict is not None:
+                self.on_evict(entry_dir)
+
+
+class DayCache(ResultCache):
+    """
+    按天的处理结果缓存，每天的结果保存为 cache_dir/指纹-规则版本/ 下的若干Parquet文件：
+    各阶段处理后的长表（文件名为阶段名称）和该天的每日统计
+    """
+
+    def __init__(self, cache_dir=DAY_CACHE_DIR, max_bytes=MAX_DAY_CACHE_BYTES):
+        super().__init__(cache_dir, max_bytes)
+
+    def get_day(self, fingerprint, rule_version):
+        """
+        查找一天的缓存结果，命中时返回 ({阶段名称: 长表}, {每日工作表名称: 每日统计})，未命中返回None
+        """
+        entry_dir = self._entry_dir(fingerprint, rule_version)
+        with self._lock:
+            try:
+                filenames = sorted(os.listdir(entry_dir))
+                for filename in filenames:
+                    os.utime(os.path.join(entry_dir, filename))
+            except OSError:
+                return None
+
+        stages = {}
+        daily_summaries = {}
+        try:
+            for filename in filenames:
+                name, _ = os.path.splitext(filename)
+                sheets = intermediate.load_sheets(os.path.join(entry_dir, filename))
+                if name == DAILY_SUMMARY_NAME:
+                    daily_summaries = sheets
+                else:
+                    stages[name] = next(iter(sheets.values()))
+        except OSError:
+            # 读取过程中被其他线程淘汰，按未命中处理
+            return None
+        return stages, daily_summaries
+
+    def put_day(self, fingerprint, rule_version, stages, daily_summaries):
+        """保存一天的处理结果；超过大小上限时淘汰最久未使用的结果"""
+        entry_dir = self._entry_dir(fingerprint, rule_version)
+        tmp_dir = _tmp_name(entry_dir)
+        with self._lock:
+            if os.path.isdir(entry_dir):
+                return
+            try:
+                os.makedirs(tmp_dir, exist_ok=True)
+                for name, df in stages.items():
+                    intermediate.save_sheets(os.path.join(tmp_dir, name + intermediate.INTERMEDIATE_EXT), {name: df})
+                intermediate.save_sheets(
+                    os.path.join(tmp_dir, DAILY_SUMMARY_NAME + intermediate.INTERMEDIATE_EXT), daily_summaries)
+                os.replace(tmp_dir, entry_dir)
+            except OSError:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                # 其他进程同时处理了同一天并先写入了缓存（改名到已存在的目录失败），内容相同，按写入成功处理
+                if os.path.isdir(entry_dir):
+                    return
+                raise
+            self._evict(keep=entry_dir)
@@ -0,0 +1,47 @@
+"""
+打卡长表的统一数据类型
+
+流水线在合并的录入阶段（pipeline.ingest）把四次打卡分列、推断班次后，一次性转换为以下类型，
+之后各阶段直接使用，不再为每个单元格保存一份字符串：
+  - 姓名、员工ID、部门：分类类型（第1阶段整理长表时已转换）；
+  - 班次：固定类别（早班、中班、晚班）的分类类型，空值表示未排班；
+  - 第一次～第四次打卡：原始打卡文本的分类类型（不同的取值只有几千个），空值表示没有打卡。
+    保留原文（"次日06:30"、"凌晨01:30"、"请假"、未精简时拼在一起的多次打卡等），中间结果下载后与原来相同；
+    计算用的分钟数只在第4阶段内部由各类别解析得到（见 punch_minutes），不保存在长表中；
+  - 迟到时间、早退时间：可空的 Int16 分钟数（见 shift_engine）；
+  - 上班卡类型、下班卡类型、打卡状态等结果文字：共用一组类别的分类类型（见 shift_engine.label_dtype）。
+"""
+import numpy as np
+import pandas as pd
+
+from modules import time_parse
+
+PUNCH_COLS = ['第一次打卡', '第二次打卡', '第三次打卡', '第四次打卡']
+# 计算时打卡分钟数的类型（没有打卡或无法识别为 time_parse.MISSING）
+PUNCH_DTYPE = np.int16
+SHIFT_DTYPE = pd.CategoricalDtype(['早班', '中班', '晚班'])
+# 可空的小整数（分钟数等）
+DURATION_DTYPE = 'Int16'
+
+
+def punch_minutes(series):
+    """
+    将一列打卡时间转换为 int16 分钟数数组（解析规则同 time_parse.parse_punch）
+    分类类型只解析各类别，其余每个不同的取值解析一次
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        table = np.array([time_parse.parse_punch(v) for v in series.cat.categories] + [time_parse.MISSING],
+                         dtype=PUNCH_DTYPE)
+        # 空值的编码为 -1，正好取到表末尾的 MISSING
+        return table[series.cat.codes.to_numpy()]
+    return time_parse.parse_series(series).astype(PUNCH_DTYPE)
+
+
+def to_canonical(df):
+    """将打卡列、班次列转换为分类类型（在原DataFrame上转换），返回该DataFrame"""
+    for col in PUNCH_COLS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    if '班次' in df.columns:
+        df['班次'] = df['班次'].astype(SHIFT_DTYPE)
+    return df
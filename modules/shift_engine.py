@@ -0,0 +1,451 @@
+"""
+全班次打卡规则的向量化实现
+
+早班/中班/晚班的规则只取决于每次打卡落在一天中的哪一分钟，因此先把规则编译成
+按分钟索引的决策表（每张表 1440 项，末尾再加一项表示缺卡），表中直接给出
+上班卡类型、迟到时间、下班卡类型、早退时间、加班时长等结果。
+迟到时间、早退时间以整数分钟数输出（后勤部及未知班次为空值），显示文本在导出时生成（见 durations.py）；
+上班卡类型等结果文字以分类类型输出；打卡列可以是字符串，也可以是 schema 转换后的分类类型（只解析各类别）。
+处理工作表时把打卡时间转换为分钟数后，各结果列只需一次数组索引即可得到。
+夜班补贴时长（原 66.py 逐行解析下班卡类型文本）也在同一次计算中由下班卡时间的分钟数直接得到。
+
+决策表按规则版本（SHIFT_RULES 的哈希）缓存到磁盘，规则不变时各进程直接加载。
+计算结果（包括数值类型）与 4全班.py 中逐行处理的 process_*_shift 函数完全一致。
+"""
+import hashlib
+import json
+import os
+import pickle
+import threading
+
+import numpy as np
+import pandas as pd
+
+from modules import schema, time_parse
+
+PUNCH_COLS = ['第一次打卡', '第二次打卡', '第三次打卡', '第四次打卡']
+RESULT_COLS = [
+    '上班卡类型', '迟到时间', '早退时间',
+    '中午下班卡类型', '中午上班卡类型', '白天加班时长(小时)',
+    '下班卡类型', '晚上加班时长(小时)', '打卡状态'
+]
+# 以分钟数输出的时长列（可空的 Int16）
+DURATION_COLS = ['迟到时间', '早退时间']
+# 以分类类型输出的结果文字列（共用 label_dtype 的类别）
+LABEL_COLS = ['上班卡类型', '中午下班卡类型', '中午上班卡类型', '下班卡类型', '打卡状态']
+# 决策表之外由 apply_shift_rules 直接写入的结果文字
+_FIXED_LABELS = ["未知班次", "", "正常打卡", "未打卡", "缺勤", "正常"]
+# 夜班补贴时长列；下班卡时间在补贴区间内（不含两端）时，补贴时长为下班卡时间减去区间开始时间
+SUBSIDY_COL = '夜班补贴时长(小时)'
+SUBSIDY_WINDOW = ('04:00', '09:00')
+
+# 缺失或无法解析的打卡；作为下标时正好取到决策表的最后一项
+MISSING = time_parse.MISSING
+# 计算过程中保存下班卡时间的内部列（不输出）
+_CLOCK_OUT = '_下班卡时间'
+
+# 各班次的时间界限（修改后规则版本随之变化，决策表会重新生成）
+SHIFT_RULES = {
+    '早班': {
+        'work_start': '08:00',        # 上班时间
+        'late_limit': '12:00',        # 迟到截止，之后视为缺勤
+        'noon_start': '12:00',        # 中午打卡区间开始
+        'noon_end': '13:30',          # 中午打卡区间结束
+        'noon_early_end': '12:30',    # 12:30前回来算白天加班1小时
+        'work_end': '17:30',          # 下班时间
+        'overtime_break': '18:00',    # 晚于该时间下班，加班扣除0.5小时
+        'system_rest': '05:00',       # 次日该时间前的打卡仍算前一天下班
+    },
+    '中班': {
+        'work_start': '13:30',
+        'late_limit': '17:30',
+        'break_start': '17:30',       # 傍晚打卡区间开始
+        'break_end': '18:00',         # 傍晚打卡区间结束
+        'work_end': '22:00',
+        'system_rest': '07:00',       # 次日该时间前的打卡算跨天下班（扣除0.5小时休息）
+    },
+    '晚班': {
+        'work_start': '18:00',
+        'second_start': '20:00',      # 18:00-20:00打卡记为对应时间上班卡
+        'late_limit': '23:00',
+        'work_end': '02:00',          # 次日下班时间
+        'overtime_limit': '09:00',    # 次日该时间前下班计算加班（扣除0.5小时）
+    },
+}
+
+# 决策表结构版本，修改编译逻辑时递增
+_TABLE_FORMAT = 3
+
+
+def rule_version(rules):
+    """规则版本：决策表结构版本及各班次时间界限的哈希，rules 中任一时间界限修改后随之变化"""
+    return hashlib.sha1(
+        json.dumps({'format': _TABLE_FORMAT, 'rules': rules}, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    ).hexdigest()[:12]
+
+
+# 决策表缓存、按天缓存及结果缓存都以规则版本为键，修改 SHIFT_RULES 后旧的结果不会再被使用
+RULE_VERSION = rule_version(SHIFT_RULES)
+
+# 决策表磁盘缓存目录
+TABLE_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'cache')
+
+# 每个班次取哪几次打卡作为上班卡、下班卡（按优先顺序，下标对应 PUNCH_COLS），以及中午区间用哪几次打卡
+_PUNCH_ROLES = {
+    '早班': {'start': (0, 1), 'end': (3, 2), 'noon': (1, 2)},
+    '中班': {'start': (0, 1), 'end': (3,), 'noon': (1, 2)},
+    '晚班': {'start': (0,), 'end': (1,), 'noon': ()},
+}
+
+_MINUTES = range(1440)
+
+
+def _to_minutes(hhmm):
+    hours, minutes = hhmm.split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+def _hhmm(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def _round_down(minutes):
+    """向下取整到整点或半点（与 4全班.round_down_to_hour 相同）"""
+    return minutes - minutes % 30
+
+
+def _early_minutes(total_minutes):
+    """早退时间向上取整到整小时，返回分钟数"""
+    return (total_minutes // 60 + (1 if total_minutes % 60 > 0 else 0)) * 60
+
+
+def _hours(minutes):
+    """分钟数转为小时数（与原脚本 hour + minute / 60 的算法相同）"""
+    hours, minutes = divmod(minutes, 60)
+    return hours + minutes / 60
+
+
+def _overtime_value(minutes):
+    """与原脚本 max(0, round(小时数, 1)) 相同：不足0或为0时返回整数0"""
+    return max(0, round(_hours(minutes), 1))
+
+
+def _new_table(default):
+    # 1440 个分钟 + 末尾一项缺卡
+    return np.full(1441, default, dtype=object)
+
+
+def _compile_morning(rule):
+    """早班（对应 4全班.process_morning_shift）"""
+    work_start = _to_minutes(rule['work_start'])
+    late_limit = _to_minutes(rule['late_limit'])
+    noon_start, noon_end = _to_minutes(rule['noon_start']), _to_minutes(rule['noon_end'])
+    noon_early_end = _to_minutes(rule['noon_early_end'])
+    work_end = _to_minutes(rule['work_end'])
+    overtime_break = _to_minutes(rule['overtime_break'])
+    system_rest = _to_minutes(rule['system_rest'])
+
+    t = _base_tables("下班缺卡")
+    for m in _MINUTES:
+        # 上班卡
+        if m <= work_start:
+            t['start_type'][m] = "8:00上班卡"
+        elif m <= late_limit:
+            t['start_type'][m] = "迟到"
+            t['late_minutes'][m] = m - work_start
+
+        # 中午打卡
+        t['noon_window'][m] = noon_start <= m <= noon_end
+        if m <= noon_early_end:
+            t['noon_back'][m] = "12:30上班卡"
+            t['day_overtime'][m] = 1
+        else:
+            t['noon_back'][m] = "13:30上班卡"
+
+        # 下班卡
+        rounded = _round_down(m)
+        if m >= work_end:
+            t['end_label'][m] = f"{_hhmm(rounded)}下班卡"
+            t['clock_out'][m] = True
+            overtime = rounded - work_end - (30 if m > overtime_break else 0)
+            t['overtime'][m] = _overtime_value(overtime)
+        elif m <= system_rest:
+            # 次日凌晨下班：17:30到24:00再加上次日时长
+            t['end_label'][m] = f"{_hhmm(rounded)}下班卡"
+            t['clock_out'][m] = True
+            t['overtime'][m] = max(0, round((24 - _hours(work_end)) + _hours(rounded), 1))
+        else:
+            t['early_minutes'][m] = _early_minutes(work_end - m)
+            t['end_label'][m] = f"{_hhmm(rounded)}下班卡-早退"
+        t['end_sets_label'][m] = True
+    t['noon_out'] = "12:00下班卡"
+    return t
+
+
+def _compile_afternoon(rule):
+    """中班（对应 4全班.process_afternoon_shift）"""
+    work_start = _to_minutes(rule['work_start'])
+    late_limit = _to_minutes(rule['late_limit'])
+    break_start, break_end = _to_minutes(rule['break_start']), _to_minutes(rule['break_end'])
+    work_end = _to_minutes(rule['work_end'])
+    system_rest = _to_minutes(rule['system_rest'])
+
+    t = _base_tables("缺卡")
+    for m in _MINUTES:
+        if m <= work_start:
+            t['start_type'][m] = "13:30上班卡"
+        elif m <= late_limit:
+            t['start_type'][m] = "迟到"
+            t['late_minutes'][m] = m - work_start
+
+        t['noon_window'][m] = break_start <= m <= break_end
+        t['noon_back'][m] = "18:00上班卡"
+
+        rounded = _round_down(m)
+        if m <= system_rest:
+            # 跨天：22:00到次日打卡时间，减去0.5小时休息
+            t['end_label'][m] = f"{_hhmm(rounded)}下班卡"
+            t['clock_out'][m] = True
+            total = (24 - _hours(work_end)) + _hours(rounded) - 0.5
+            ot_h = int(total)
+            ot_m = int(round((total - ot_h) * 60))
+            t['overtime'][m] = max(0, round(ot_h + ot_m / 60, 1))
+        elif m >= work_end:
+            t['end_label'][m] = f"{_hhmm(rounded)}下班卡"
+            t['clock_out'][m] = True
+            t['overtime'][m] = _overtime_value(rounded - work_end)
+        else:
+            t['early_minutes'][m] = _early_minutes(work_end - m)
+            t['end_label'][m] = f"{_hhmm(rounded)}下班卡-早退"
+            t['overtime'][m] = 0.0
+        t['end_sets_label'][m] = True
+    t['noon_out'] = "17:30下班卡"
+    return t
+
+
+def _compile_night(rule):
+    """晚班（对应 4全班.process_night_shift）"""
+    work_start = _to_minutes(rule['work_start'])
+    second_start = _to_minutes(rule['second_start'])
+    late_limit = _to_minutes(rule['late_limit'])
+    work_end = _to_minutes(rule['work_end'])
+    overtime_limit = _to_minutes(rule['overtime_limit'])
+
+    t = _base_tables("缺卡")
+    for m in _MINUTES:
+        rounded = _round_down(m)
+        if m <= work_start:
+            t['start_type'][m] = "18:00上班卡"
+        elif m <= second_start:
+            # 该时段的上班卡记在下班卡类型列（除非被下班卡覆盖）
+            t['start_type'][m] = ""
+            t['start_label'][m] = f"{_hhmm(rounded)}上班卡"
+        elif m <= late_limit:
+            t['start_type'][m] = "迟到"
+            t['late_minutes'][m] = m - work_start
+
+        if m <= work_end:
+            t['early_minutes'][m] = _early_minutes(work_end - m)
+            t['overtime'][m] = 0.0
+        elif m <= overtime_limit:
+            t['end_label'][m] = f"{_hhmm(rounded)}下班卡"
+            t['end_sets_label'][m] = True
+            t['clock_out'][m] = True
+            t['overtime'][m] = round(_hours(max(0, rounded - work_end - 30)), 1)
+    return t
+
+
+def _base_tables(missing_end_status):
+    """各班次共用的默认表：未命中任何区间时为缺勤/无加班，末尾一项表示缺卡"""
+    t = {
+        'start_type': _new_table("缺勤"),         # 上班卡类型
+        'late_minutes': np.zeros(1441, dtype=np.int32),  # 迟到分钟数
+        'start_label': _new_table(""),            # 由上班卡决定的下班卡类型（仅晚班）
+        'noon_window': np.zeros(1441, dtype=bool),  # 是否落在中午/傍晚打卡区间
+        'noon_back': _new_table(""),              # 区间内第二次打卡对应的中午上班卡类型
+        'day_overtime': _new_table(""),           # 区间内第二次打卡对应的白天加班时长
+        'end_label': _new_table(""),              # 下班卡类型
+        'end_sets_label': np.zeros(1441, dtype=bool),
+        'clock_out': np.zeros(1441, dtype=bool),  # 下班卡类型为 "HH:MM下班卡"（取整后的下班卡时间）
+        'early_minutes': np.zeros(1441, dtype=np.int32),  # 早退分钟数（整小时）
+        'overtime': _new_table(""),               # 晚上加班时长
+        'missing_end_status': missing_end_status,
+        'noon_out': "",
+    }
+    t['end_label'][MISSING] = "缺卡"
+    t['end_sets_label'][MISSING] = True
+    return t
+
+
+def build_tables():
+    """按 SHIFT_RULES 编译所有班次的决策表"""
+    return {
+        '早班': _compile_morning(SHIFT_RULES['早班']),
+        '中班': _compile_afternoon(SHIFT_RULES['中班']),
+        '晚班': _compile_night(SHIFT_RULES['晚班']),
+    }
+
+
+_tables = None
+# 多个处理任务在同一进程的不同线程中运行时，决策表只编译一次
+_tables_lock = threading.Lock()
+
+
+def get_tables():
+    """获取当前规则版本的决策表：优先使用内存/磁盘缓存，没有时重新编译并写入缓存"""
+    global _tables
+    if _tables is not None:
+        return _tables
+
+    with _tables_lock:
+        if _tables is not None:
+            return _tables
+
+        cache_path = os.path.join(TABLE_CACHE_DIR, f"shift_tables_{RULE_VERSION}.pkl")
+        try:
+            with open(cache_path, 'rb') as f:
+                _tables = pickle.load(f)
+            return _tables
+        except (OSError, pickle.UnpicklingError, EOFError):
+            pass
+
+        tables = build_tables()
+        try:
+            os.makedirs(TABLE_CACHE_DIR, exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(tables, f)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"决策表缓存写入失败: {e}")
+        _tables = tables
+    return _tables
+
+
+def subsidy_hours(clock_out):
+    """由下班卡时间（分钟数数组，MISSING 表示没有下班卡）计算夜班补贴时长（小时）"""
+    start, end = (_to_minutes(hhmm) for hhmm in SUBSIDY_WINDOW)
+    clock_out = np.asarray(clock_out)
+    inside = (clock_out > start) & (clock_out < end)
+    return np.where(inside, clock_out - start, 0) / 60
+
+
+def punch_minutes(series):
+    """
+    将一列打卡时间转换为分钟数数组（解析规则同 4全班.parse_time，见 time_parse.parse_punch）
+    无法识别的打卡与缺卡相同
+    """
+    return schema.punch_minutes(series).astype(np.int32)
+
+
+def _stripped_text(series):
+    """与 series.astype(str).str.strip() 相同，分类类型只处理各类别"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        labels = np.append(series.cat.categories.astype(str).str.strip().to_numpy(dtype=object), 'nan')
+        return labels[series.cat.codes.to_numpy()]
+    return series.astype(str).str.strip().to_numpy()
+
+
+_label_dtype = None
+
+
+def label_dtype():
+    """结果文字列的分类类型：类别为决策表及 apply_shift_rules 中可能出现的所有文字（按规则版本确定）"""
+    global _label_dtype
+    if _label_dtype is None:
+        labels = set(_FIXED_LABELS)
+        for t in get_tables().values():
+            for key in ('start_type', 'start_label', 'noon_back', 'end_label'):
+                labels.update(t[key])
+            labels.update([t['noon_out'], t['missing_end_status']])
+        _label_dtype = pd.CategoricalDtype(sorted(labels))
+    return _label_dtype
+
+
+def _first_valid(punches, order):
+    """按优先顺序取第一次有效的打卡"""
+    result = punches[order[0]]
+    for i in order[1:]:
+        result = np.where(result != MISSING, result, punches[i])
+    return result
+
+
+def _classify(out, idx, t, roles, punches):
+    """用决策表计算某一班次分组的所有结果列"""
+    punches = [p[idx] for p in punches]
+    start = _first_valid(punches, roles['start'])
+    end = _first_valid(punches, roles['end'])
+
+    out['上班卡类型'][idx] = t['start_type'][start]
+    out['迟到时间'][idx] = t['late_minutes'][start]
+    out['早退时间'][idx] = t['early_minutes'][end]
+    out['下班卡类型'][idx] = np.where(t['end_sets_label'][end], t['end_label'][end], t['start_label'][start])
+    out[_CLOCK_OUT][idx] = np.where(t['clock_out'][end], _round_down(end), MISSING)
+    out['晚上加班时长(小时)'][idx] = t['overtime'][end]
+
+    # 中午（中班为傍晚）区间打卡：第一次记下班卡，第二次按时间记上班卡
+    count = np.zeros(len(idx), dtype=int)
+    for i in roles['noon']:
+        count += t['noon_window'][punches[i]]
+    back = punches[roles['noon'][-1]] if roles['noon'] else start
+    out['中午下班卡类型'][idx] = np.where(count >= 1, t['noon_out'], "")
+    out['中午上班卡类型'][idx] = np.where(count == 2, t['noon_back'][back], np.where(count == 1, "未打卡", ""))
+    out['白天加班时长(小时)'][idx] = np.where(count == 2, t['day_overtime'][back], "")
+
+    out['打卡状态'][idx] = np.where(
+        t['start_type'][start] == "缺勤", "缺勤",
+        np.where(end == MISSING, t['missing_end_status'], "正常")
+    )
+
+
+def _logistics(out, idx, df):
+    """后勤部（对应 4全班.process_logistics）：有任意打卡即为正常"""
+    sub = df.iloc[idx]
+    has_punch = np.zeros(len(idx), dtype=bool)
+    for col in PUNCH_COLS:
+        has_punch |= sub[col].notna().to_numpy() & (_stripped_text(sub[col]) != "")
+    for col in RESULT_COLS:
+        if col not in DURATION_COLS:
+            out[col][idx] = ""
+    out['打卡状态'][idx] = np.where(has_punch, "正常", "缺勤")
+    out['上班卡类型'][idx] = np.where(has_punch, "正常打卡", "未打卡")
+
+
+def apply_shift_rules(df, subsidy=False):
+    """
+    按班次计算整张工作表的结果列，返回添加结果列后的DataFrame
+    subsidy: 为True时同时添加夜班补贴时长列（与 66.add_subsidy 由下班卡类型计算的结果相同）
+    """
+    tables = get_tables()
+    n = len(df)
+    punches = [punch_minutes(df[col]) for col in PUNCH_COLS]
+    department = _stripped_text(df['部门'])
+    shift = _stripped_text(df['班次'])
+
+    # 未知班次的行所有结果列均为"未知班次"（时长列为空值）
+    out = {col: np.full(n, "未知班次", dtype=object) for col in RESULT_COLS}
+    for col in DURATION_COLS:
+        out[col] = np.full(n, np.nan)
+    # 下班卡时间（分钟数），后勤部、未知班次及没有下班卡的行为 MISSING
+    out[_CLOCK_OUT] = np.full(n, MISSING, dtype=np.int32)
+
+    # 后勤部单独处理，不考虑班次
+    logistics = department == '后勤部'
+    idx = np.flatnonzero(logistics)
+    if len(idx):
+        _logistics(out, idx, df)
+    for shift_name, roles in _PUNCH_ROLES.items():
+        idx = np.flatnonzero(~logistics & (shift == shift_name))
+        if len(idx):
+            _classify(out, idx, tables[shift_name], roles, punches)
+
+    for col in RESULT_COLS:
+        if col in DURATION_COLS:
+            df[col] = pd.array(out[col], dtype=schema.DURATION_DTYPE)
+        elif col in LABEL_COLS:
+            df[col] = pd.Categorical(out[col], dtype=label_dtype())
+        else:
+            df[col] = out[col]
+    if subsidy:
+        df[SUBSIDY_COL] = subsidy_hours(out[_CLOCK_OUT])
+    return df
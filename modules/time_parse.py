@@ -0,0 +1,87 @@
+"""
+HH:MM 打卡时间的解析
+
+一天只有1440个不同的时刻，各阶段却对每个打卡时间调用一次 datetime.strptime(..., '%H:%M')。
+这里预先生成 "时刻字符串 → 零点起的分钟数" 的查找表，解析时先查表，结果与 strptime 相同：
+  - parse_hhmm：严格按 '%H:%M' 解析（含 "8:05"、"08:5" 等一位数写法），
+    表中没有的字符串（如全角数字）才调用 strptime；
+  - parse_punch：打卡时间的解析规则（同 4全班.parse_time），去除首尾空白，
+    "次日"、"凌晨" 前缀的时刻也已在表中；
+  - parse_series：解析一整列，每个不同的取值只解析一次。
+无法解析时返回 MISSING。
+"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# 没有打卡或无法解析的时间
+MISSING = -1
+# 打卡时间中可以忽略的前缀
+PREFIXES = ('次日', '凌晨')
+
+
+def _hour_texts(hour):
+    """strptime 的 %H 接受的写法：两位数，小于10时也可以是一位数"""
+    return [f"{hour:02d}", str(hour)] if hour < 10 else [f"{hour:02d}"]
+
+
+def _build_tables():
+    hhmm = {}
+    for hour in range(24):
+        for minute in range(60):
+            for hour_text in _hour_texts(hour):
+                for minute_text in _hour_texts(minute):
+                    hhmm[f"{hour_text}:{minute_text}"] = hour * 60 + minute
+    # 带前缀的时刻（前缀与时刻之间可以有空白，这类写法查不到表时再清理）
+    punch = dict(hhmm)
+    for prefix in PREFIXES:
+        punch.update({prefix + text: minutes for text, minutes in hhmm.items()})
+    return hhmm, punch
+
+
+_HHMM_TABLE, _PUNCH_TABLE = _build_tables()
+
+
+def parse_hhmm(text):
+    """严格按 '%H:%M' 解析（与 datetime.strptime 相同），返回分钟数；不是字符串或无法解析时返回 MISSING"""
+    minutes = _HHMM_TABLE.get(text) if isinstance(text, str) else None
+    if minutes is not None:
+        return minutes
+    if not isinstance(text, str):
+        return MISSING
+    try:
+        time_obj = datetime.strptime(text, '%H:%M')
+    except ValueError:
+        return MISSING
+    return time_obj.hour * 60 + time_obj.minute
+
+
+def parse_punch(value):
+    """
+    按 4全班.parse_time 的规则解析打卡时间，返回分钟数
+    空值、空白返回 MISSING；去除首尾空白及 "次日"、"凌晨" 前缀后按 '%H:%M' 解析
+    """
+    if isinstance(value, str):
+        text = value.strip()
+    elif pd.isna(value):
+        return MISSING
+    else:
+        text = str(value).strip()
+    minutes = _PUNCH_TABLE.get(text)
+    if minutes is not None:
+        return minutes
+    if not text:
+        return MISSING
+    for prefix in PREFIXES:
+        text = text.replace(prefix, '')
+    return parse_hhmm(text.strip())
+
+
+def parse_series(values, parse=parse_punch):
+    """将一列时间转换为分钟数数组（int32），每个不同的取值只用 parse 解析一次，空值为 MISSING"""
+    codes, uniques = pd.factorize(values)
+    table = np.array([parse(v) for v in uniques] + [MISSING], dtype=np.int32)
+    # 空值的编码为 -1，正好取到表末尾的 MISSING
+    return table[codes]
+
@@ -0,0 +1,94 @@
+"""
+打卡时间解析性能测试
+
+生成一组模拟的打卡时间（含一位数写法、"次日"/"凌晨" 前缀、前后空白及空值），
+分别用逐个调用 datetime.strptime、逐个查表（time_parse.parse_punch）和整列解析（time_parse.parse_series）
+转换为分钟数，核对三者结果相同，并输出各方式每秒解析的个数。
+
+用法：python time_parse_benchmark.py [打卡时间个数] [重复次数]
+"""
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+# 直接运行本脚本时，将项目根目录加入搜索路径以便导入 modules 包
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from modules import time_parse
+
+
+def _punch_value(rng):
+    """随机生成一个打卡时间，大部分为 "HH:MM"，少量为其他写法或空值"""
+    minute = rng.randrange(24 * 60)
+    text = f"{minute // 60:02d}:{minute % 60:02d}"
+    r = rng.random()
+    if r < 0.05:
+        return None
+    if r < 0.10:
+        return f"{minute // 60}:{minute % 60}"
+    if r < 0.15:
+        return rng.choice(time_parse.PREFIXES) + text
+    if r < 0.20:
+        return f" {text} "
+    return text
+
+
+def make_values(count=1_000_000, seed=0):
+    """生成 count 个模拟的打卡时间"""
+    rng = random.Random(seed)
+    return [_punch_value(rng) for _ in range(count)]
+
+
+def strptime_minutes(value):
+    """原来的解析方式：每个值调用一次 strptime（规则同 4全班.parse_time）"""
+    if pd.isna(value) or str(value).strip() == "":
+        return time_parse.MISSING
+    cleaned = str(value).strip().replace("次日", "").replace("凌晨", "").strip()
+    try:
+        time_obj = datetime.strptime(cleaned, "%H:%M")
+    except ValueError:
+        return time_parse.MISSING
+    return time_obj.hour * 60 + time_obj.minute
+
+
+def benchmark(func, values, repeat=3):
+    """执行 func(values) repeat 次，返回 (结果, 最快一次的秒数)"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(values)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return np.asarray(result, dtype=np.int32), best
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    values = make_values(count)
+    series = pd.Series(values, dtype=object)
+    methods = [
+        ('strptime', lambda v: [strptime_minutes(x) for x in v]),
+        ('parse_punch', lambda v: [time_parse.parse_punch(x) for x in v]),
+        ('parse_series', lambda v: time_parse.parse_series(series)),
+    ]
+
+    print(f"模拟打卡时间 {count} 个，每种方式解析 {repeat} 次取最快一次")
+    print(f"{'方式':<14}{'耗时(秒)':>10}{'个/秒':>14}{'加速':>8}")
+    expected = None
+    base_seconds = None
+    for name, func in methods:
+        result, seconds = benchmark(func, values, repeat)
+        if expected is None:
+            expected, base_seconds = result, seconds
+        elif not np.array_equal(result, expected):
+            raise AssertionError(f"{name} 的解析结果与 strptime 不同")
+        print(f"{name:<14}{seconds:>10.3f}{count / seconds:>14.0f}{base_seconds / seconds:>7.1f}x")
+    print("各方式的解析结果相同")
@@ -0,0 +1,120 @@
+"""
+上传文件的流式保存
+
+multipart/form-data 请求体边接收边解析，文件字段的内容直接写入目标文件，同时统计字节数、计算SHA-256，
+不再先由框架把整个请求体缓存到临时文件。解析和写入是同步的，API服务在线程池中调用 write，不阻塞事件循环；
+请求体大小由调用方边接收边累计，超过上限时立即中止。
+"""
+import hashlib
+import os
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ModuleNotFoundError:  # python-multipart 0.0.13 之前的版本（api_requirements.txt）模块名为 multipart
+    from multipart.multipart import MultipartParser, parse_options_header
+
+
+class UploadError(Exception):
+    """请求体不是合法的 multipart/form-data，或其中没有文件字段"""
+
+
+class MultipartFileWriter:
+    """
+    解析 multipart/form-data 请求体，将字段 field_name 的文件内容写入 path_prefix + "_" + 文件名
+    用法：依次调用 write(数据块)，最后调用 finish()；之后 path、filename、size、sha256 为保存的文件信息
+    出错时调用 discard() 删除未完整写入的文件
+    """
+
+    def __init__(self, content_type, path_prefix, field_name='file'):
+        media_type, params = parse_options_header(content_type or '')
+        if media_type != b'multipart/form-data' or b'boundary' not in params:
+            raise UploadError("请求必须为 multipart/form-data 格式")
+        self.path_prefix = path_prefix
+        self.field_name = field_name
+        self.path = None
+        self.filename = None
+        self.size = 0
+        self._sha256 = hashlib.sha256()
+        self._file = None
+        self._writing = False
+        self._header_field = b''
+        self._header_value = b''
+        self._disposition = b''
+        self._parser = MultipartParser(params[b'boundary'], {
+            'on_part_begin': self._on_part_begin,
+            'on_header_field': self._on_header_field,
+            'on_header_value': self._on_header_value,
+            'on_header_end': self._on_header_end,
+            'on_headers_finished': self._on_headers_finished,
+            'on_part_data': self._on_part_data,
+            'on_part_end': self._on_part_end,
+        })
+
+    @property
+    def sha256(self):
+        return self._sha256.hexdigest()
+
+    def write(self, chunk):
+        """解析一块请求体，文件内容写入磁盘"""
+        try:
+            self._parser.write(chunk)
+        except ValueError as e:
+            raise UploadError(f"请求体格式不正确: {e}") from e
+
+    def finish(self):
+        """请求体接收完毕：关闭文件，没有文件字段时抛出 UploadError"""
+        try:
+            self._parser.finalize()
+        except ValueError as e:
+            raise UploadError(f"请求体格式不正确: {e}") from e
+        self._close()
+        if self.path is None:
+            raise UploadError(f"请求中没有文件字段 {self.field_name}")
+
+    def discard(self):
+        """关闭并删除未完整写入的文件"""
+        self._close()
+        if self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _on_part_begin(self):
+        self._disposition = b''
+
+    def _on_header_field(self, data, start, end):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data, start, end):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        if self._header_field.lower() == b'content-disposition':
+            self._disposition = self._header_value
+        self._header_field = b''
+        self._header_value = b''
+
+    def _on_headers_finished(self):
+        _, params = parse_options_header(self._disposition)
+        name = params.get(b'name', b'').decode('utf-8', 'replace')
+        # 只保存第一个同名的文件字段，其余字段忽略
+        self._writing = name == self.field_name and b'filename' in params and self.path is None
+        if self._writing:
+            self.filename = os.path.basename(params[b'filename'].decode('utf-8', 'replace'))
+            self.path = f"{self.path_prefix}_{self.filename}"
+            self._file = open(self.path, 'wb')
+
+    def _on_part_data(self, data, start, end):
+        if self._writing:
+            chunk = data[start:end]
+            self.size += len(chunk)
+            self._sha256.update(chunk)
+            self._file.write(chunk)
+
+    def _on_part_end(self):
+        if self._writing:
+            self._writing = False
+            self._close()
@@ -0,0 +1,125 @@
+"""
+常驻工作进程池
+
+API服务和Streamlit应用启动时创建一组工作进程，进程启动时即导入 pandas、openpyxl 及各处理阶段的模块，
+并加载班次判定表，之后每个处理任务直接把按天拆分的工作交给这些已就绪的进程执行，
+不再为每个任务重新启动进程、重新导入模块。
+
+工作进程执行一定数量的任务后，或任务完成后内存占用超过上限时，整个进程池会被替换为新的进程：
+已提交的工作在旧进程中执行完毕，之后的任务交给新进程。
+POSIX系统上使用 forkserver 方式启动进程，forkserver 预先导入处理模块，新进程从中派生，替换进程池也只需几毫秒。
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from modules.metrics import current_rss_mb
+
+# 工作进程中预先导入的模块（导入 pipeline 即导入全部处理阶段及 pandas、openpyxl）
+PRELOAD_MODULES = ['modules.pipeline']
+# 默认每个进程池执行多少个任务后替换为新的进程
+MAX_JOBS = 50
+# 默认工作进程内存占用上限（MB），超过后替换进程池
+MAX_MEMORY_MB = 1024
+
+
+def _init_worker():
+    """工作进程启动时导入处理模块并加载班次判定表"""
+    import importlib
+    for name in PRELOAD_MODULES:
+        importlib.import_module(name)
+    from modules import shift_engine
+    shift_engine.get_tables()
+
+
+def _call(func, args):
+    """
+    在工作进程中执行 func(*args)，同时返回执行后本进程的内存占用（MB）
+    （不用内存峰值：各阶段的运行指标在阶段开始时会重置进程的峰值，见 metrics.py）
+    """
+    return func(*args), current_rss_mb()
+
+
+def _warm_up():
+    return None
+
+
+def _mp_context():
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context('forkserver')
+        ctx.set_forkserver_preload(PRELOAD_MODULES)
+        return ctx
+    return multiprocessing.get_context('spawn')
+
+
+class WorkerPool:
+    """
+    常驻的工作进程池，用法同 ProcessPoolExecutor.map，每次 map 调用计为一个任务
+    workers: 工作进程数
+    max_jobs: 执行多少个任务后替换进程池
+    max_memory_mb: 任务完成后任一工作进程的内存占用超过该值（MB）时，替换进程池
+    """
+
+    def __init__(self, workers, max_jobs=MAX_JOBS, max_memory_mb=MAX_MEMORY_MB):
+        self.workers = max(1, workers)
+        self.max_jobs = max_jobs
+        self.max_memory_mb = max_memory_mb
+        self.jobs = 0
+        self.recycled = 0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _new_executor(self):
+        executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=_mp_context(),
+                                       initializer=_init_worker)
+        # 提前启动全部工作进程（不等待），第一个任务到来时进程已就绪
+        for _ in range(self.workers):
+            executor.submit(_warm_up)
+        return executor
+
+    def start(self):
+        """启动工作进程（应用启动时调用），已启动时不做任何事"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._new_executor()
+        return self
+
+    def map(self, func, *iterables):
+        """在工作进程中执行 func，按输入顺序返回结果列表"""
+        # 持有锁时提交全部工作：其他任务完成后替换进程池时，已提交的工作仍在旧进程中执行完毕
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._new_executor()
+            executor = self._executor
+            futures = [executor.submit(_call, func, args) for args in zip(*iterables)]
+
+        try:
+            outputs = [future.result() for future in futures]
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+        memory = max([memory for _, memory in outputs], default=0)
+
+        with self._lock:
+            # 其他任务可能已经替换了进程池
+            if executor is self._executor:
+                self.jobs += 1
+                if self.jobs >= self.max_jobs or memory > self.max_memory_mb:
+                    self._recycle()
+        return [result for result, _ in outputs]
+
+    def _recycle(self):
+        print(f"替换工作进程池（已执行 {self.jobs} 个任务）")
+        old_executor = self._executor
+        self._executor = self._new_executor()
+        self.jobs = 0
+        self.recycled += 1
+        # 旧进程执行完已提交的工作后退出
+        old_executor.shutdown(wait=False)
+
+    def shutdown(self, wait=False):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+                self._executor = None
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 将项目根目录加入搜索路径以便导入 modules 包
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
@@ -0,0 +1,39 @@
+"""时长的显示文本：分钟数格式化后再解析得到原来的分钟数"""
+import pandas as pd
+import pytest
+
+from modules import durations
+
+
+@pytest.mark.parametrize('minutes', list(range(0, 180)) + [600, 1439, 1440, 2000, 44640])
+def test_format_minutes_round_trip(minutes):
+    assert durations.parse_late_time(durations.format_minutes(minutes)) == minutes
+
+
+@pytest.mark.parametrize('hours', list(range(0, 25)))
+def test_format_hours_round_trip(hours):
+    text = durations.format_hours(hours * 60)
+    assert durations.parse_early_leave(text) == hours * 60
+
+
+def test_display_texts():
+    assert durations.format_minutes(0) == '0分钟'
+    assert durations.format_minutes(65) == '1小时5分钟'
+    assert durations.format_minutes(120) == '2小时'
+    assert durations.format_hours(0) == '0分钟'
+    assert durations.format_hours(180) == '3小时'
+    # 原脚本写出的文本（晚班02:00下班的早退时间为 "0小时"）
+    assert durations.parse_early_leave('0小时') == 0
+    assert durations.parse_late_time('45分钟') == 45
+
+
+def test_render_round_trip():
+    df = pd.DataFrame({
+        '迟到时间': pd.array([0, 5, 65, None], dtype='Int16'),
+        '早退时间': pd.array([0, 60, 180, None], dtype='Int16'),
+    })
+    rendered = durations.render(df)
+    assert rendered['迟到时间'].tolist() == ['0分钟', '5分钟', '1小时5分钟', None]
+    assert rendered['早退时间'].tolist() == ['0分钟', '1小时', '3小时', None]
+    assert durations.to_minutes(rendered['迟到时间']).tolist() == [0, 5, 65, 0]
+    assert durations.to_minutes(rendered['早退时间'], durations.parse_early_leave).tolist() == [0, 60, 180, 0]
@@ -0,0 +1,57 @@
+"""各读取后端对同一工作簿的读取结果一致（含只有空白字符的单元格）"""
+import openpyxl
+import pandas as pd
+import pytest
+
+from modules import excel_reader
+
+# 只含空白字符的单元格：空格、多个空格、制表符、换行、全角空格、不换行空格
+BLANK_TEXTS = [' ', '   ', '\t', '\n', '　', '\xa0']
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    path = tmp_path / 'blank_cells.xlsx'
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = '上下班打卡_月报'
+    ws.append(['姓名', '部门', 1, 2, 3])
+    for i, blank in enumerate(BLANK_TEXTS):
+        ws.append([f'员工{i}', blank, '08:00 17:30', blank, ' 08:00 '])
+    # 行末尾只有空白的单元格与空单元格相同，会被去掉
+    ws.append(['员工末尾', '后勤部', '08:00', ' ', ' '])
+    ws.append(['员工数字', '后勤部', 3, 4.5, None])
+    wb.save(path)
+    return str(path)
+
+
+@pytest.mark.parametrize('backend', ['calamine', 'openpyxl'])
+def test_backend_matches_openpyxl(workbook, backend):
+    if not excel_reader.BACKENDS[backend].available():
+        pytest.skip(f'{backend} 未安装')
+    expected = excel_reader.read_sheet(workbook, backend='openpyxl')
+    result = excel_reader.read_sheet(workbook, backend=backend)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+@pytest.mark.parametrize('backend', ['calamine', 'openpyxl'])
+def test_blank_text_cells_are_empty(workbook, backend):
+    if not excel_reader.BACKENDS[backend].available():
+        pytest.skip(f'{backend} 未安装')
+    df = excel_reader.read_sheet(workbook, backend=backend)
+    rows = df['姓名'].str.startswith('员工') & df['姓名'].str[2:].str.isdigit()
+    assert df.loc[rows, '部门'].isna().all()
+    assert df.loc[rows, 2].isna().all()
+    # 前后带空白的打卡时间保留原样
+    assert (df.loc[rows, 3] == ' 08:00 ').all()
+    assert df[1].notna().all()
+
+
+def test_csv_blank_text_cells_are_empty(tmp_path):
+    path = tmp_path / 'blank_cells.csv'
+    lines = ['姓名,部门,1'] + [f'员工{i},"{blank}",08:00' for i, blank in enumerate(BLANK_TEXTS)]
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    df = excel_reader.read_sheet(str(path), backend='csv')
+    assert len(df) == len(BLANK_TEXTS)
+    assert df['部门'].isna().all()
+    assert (df[1] == '08:00').all()
@@ -0,0 +1,36 @@
+"""中间结果的Parquet存储：保存后读取的内容与原来相同"""
+import pandas as pd
+
+from modules import intermediate, pipeline
+
+TM = '上下班打卡_月报'
+
+
+def test_mixed_type_categories_round_trip(tmp_path):
+    # 数字员工ID与"kq_000"形式的员工ID混排，转换为分类类型后类别既有数字又有文字
+    df = pd.DataFrame({
+        '员工ID': pd.Series([1001, 'kq_000', 1003, None, 'kq_000'], dtype='category'),
+        '迟到时间': pd.array([5, None, 0, 30, 1], dtype='Int16'),
+    })
+    path = str(tmp_path / 'mixed.parquet')
+    intermediate.save_sheets(path, {TM: df})
+    loaded = intermediate.load_sheets(path)[TM]
+    assert isinstance(loaded['员工ID'].dtype, pd.CategoricalDtype)
+    assert loaded['员工ID'].astype(object).tolist()[:3] == [1001, 'kq_000', 1003]
+    assert pd.isna(loaded['员工ID'][3])
+    pd.testing.assert_series_equal(loaded['迟到时间'], df['迟到时间'])
+
+
+def test_pipeline_with_mixed_type_employee_ids(tmp_path):
+    matrix = pd.DataFrame({
+        '姓名': ['张三', '李四', '王五'],
+        '员工ID': [1001, 'kq_000', 1003],
+        '部门': ['生产部', '后勤部', '生产部'],
+        1: ['08:00;17:30', '07:50', '16:50'],
+        2: [None, '08:05;17:00', '08:00'],
+    })
+    input_path = tmp_path / '原始文件.xlsx'
+    matrix.to_excel(input_path, sheet_name=TM, index=False)
+    result = pipeline.run_pipeline(str(input_path), str(tmp_path / 'out'), month='2026-10')
+    total = pd.read_excel(result.output_path, sheet_name='总汇总统计')
+    assert total['员工ID'].tolist() == [1001, 'kq_000', 1003]
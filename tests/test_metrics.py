@@ -0,0 +1,20 @@
+"""阶段运行指标：内存峰值只计阶段执行期间"""
+import pytest
+
+from modules import metrics
+
+
+@pytest.mark.skipif(not metrics.reset_peak_rss(), reason='不支持重置内存峰值')
+def test_stage_peak_excludes_earlier_allocations():
+    # 阶段开始前占用再释放的内存不计入阶段的峰值
+    block = b'x' * (200 * 1024 * 1024)
+    del block
+    stage_metrics = metrics.StageMetrics()
+    with stage_metrics.stage('读取'):
+        pass
+    with stage_metrics.stage('处理'):
+        block = b'x' * (50 * 1024 * 1024)
+        del block
+    peaks = {record.stage: record.peak_rss_mb for record in stage_metrics.records()}
+    assert peaks['处理'] - peaks['读取'] >= 40
+    assert peaks['读取'] < metrics.current_rss_mb() + 100
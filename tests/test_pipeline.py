@@ -0,0 +1,118 @@
+"""流水线按天处理的中间结果"""
+import importlib
+
+import pandas as pd
+import pytest
+
+from modules import intermediate, pipeline, schema, shift_engine
+from modules.metrics import StageMetrics
+from modules.result_cache import DayCache
+
+split_stage = importlib.import_module('modules.1分割')
+
+TM = '上下班打卡_月报'
+
+
+def _matrix():
+    return pd.DataFrame({
+        '姓名': ['张三', '李四', '王五', '赵六'],
+        '员工ID': ['kq_001', 'kq_002', 'kq_003', 'kq_004'],
+        '部门': ['生产部', '后勤部', '品质部', '生产部'],
+        1: ['08:00;12:00;13:00;17:30', '07:50', '16:50;次日06:30', '07:55;08:10;12:01;12:40;13:00;17:31'],
+        2: [None, '08:05;17:00', ' 凌晨01:30', '请假'],
+    })
+
+
+@pytest.fixture
+def long_df():
+    return split_stage.normalize(_matrix(), TM, '2026-10')
+
+
+@pytest.mark.parametrize('fused', [True, False])
+def test_kept_column_stage_has_no_shift_columns(long_df, fused):
+    # 第4阶段在输入上添加结果列，不能改动保留的第3阶段结果
+    stages, _ = pipeline.process_days(long_df, TM, keep_intermediates=True, fused=fused)
+    columns = stages[pipeline.COLUMN_NAME].columns
+    assert not set(columns) & set(shift_engine.RESULT_COLS + [shift_engine.SUBSIDY_COL])
+
+
+def test_fused_and_by_stage_intermediates_have_same_columns(long_df):
+    fused, _ = pipeline.process_days(long_df, TM, keep_intermediates=True, fused=True)
+    by_stage, _ = pipeline.process_days(long_df, TM, keep_intermediates=True, fused=False)
+    for name in pipeline.DAY_STAGE_NAMES:
+        assert list(fused[name].columns) == list(by_stage[name].columns), name
+
+
+def test_punch_columns_keep_original_text(long_df):
+    # 合并执行时打卡列为分类类型，取值与逐个阶段执行（原样保留的文本，空白字符串即空值）相同
+    fused, _ = pipeline.process_days(long_df, TM, keep_intermediates=True, fused=True)
+    by_stage, _ = pipeline.process_days(long_df, TM, keep_intermediates=True, fused=False)
+    for name in [pipeline.COLUMN_NAME, pipeline.SHIFT_NAME, pipeline.SUBSIDY_NAME]:
+        for col in schema.PUNCH_COLS:
+            assert isinstance(fused[name][col].dtype, pd.CategoricalDtype)
+            values = fused[name][col].astype(object)
+            expected = pipeline._handoff(by_stage[name][[col]])[col].astype(object)
+            assert values.where(values.notna(), None).tolist() == expected.where(expected.notna(), None).tolist()
+    punches = set(fused[pipeline.COLUMN_NAME][schema.PUNCH_COLS].stack())
+    assert {'次日06:30', '请假'} <= punches
+
+
+def test_concat_days_keeps_punch_categories(long_df):
+    days = pipeline._split_days(long_df)
+    frames = [pipeline.process_days(day_df, TM, keep_intermediates=True)[0][pipeline.COLUMN_NAME] for day_df in days]
+    whole = pipeline.process_days(long_df, TM, keep_intermediates=True)[0][pipeline.COLUMN_NAME]
+    pd.testing.assert_frame_equal(pipeline._concat_frames(frames), whole)
+
+
+def test_stage_cache_counts_reused_days_as_skipped(long_df, tmp_path):
+    day_cache = DayCache(cache_dir=str(tmp_path))
+    days = pipeline._split_days(long_df)
+    for reused in (0, len(days)):
+        stage_metrics = StageMetrics()
+        _, reused_days = pipeline._run_days(days, TM, True, 1, None, day_cache, stage_metrics)
+        record = next(r for r in stage_metrics.records() if r.stage == pipeline.STAGE_CACHE)
+        assert reused_days == reused
+        assert record.sheets_skipped == reused
+
+
+def test_month_is_not_guessed_from_today():
+    # 工作表名称中没有月份、也没有指定月份时日期列为日号，结果与处理的日期无关
+    long_df = split_stage.normalize(_matrix(), TM)
+    assert long_df['日期'].tolist() == [1] * 4 + [2] * 4
+    assert split_stage.normalize(_matrix(), TM + '2026年9月')['日期'].iloc[0] == pd.Timestamp('2026-09-01')
+
+
+def test_days_beyond_month_are_not_moved_to_next_month():
+    matrix = _matrix().rename(columns={1: 29, 2: 30})
+    matrix[31] = None
+    long_df = split_stage.normalize(matrix, TM, '2026-09')
+    assert long_df['日期'].unique().tolist() == [pd.Timestamp('2026-09-29'), pd.Timestamp('2026-09-30')]
+    with pytest.raises(ValueError, match='2026-02'):
+        split_stage.normalize(matrix, TM, '2026-02')
+
+
+def test_pipeline_and_append_without_month(tmp_path):
+    base_path = tmp_path / '原始文件.xlsx'
+    _matrix()[['姓名', '员工ID', '部门', 1]].to_excel(base_path, sheet_name=TM, index=False)
+    pipeline.run_pipeline(str(base_path), str(tmp_path))
+    append_path = tmp_path / '补充.xlsx'
+    _matrix().to_excel(append_path, sheet_name=TM, index=False)
+    result = pipeline.append_days(str(append_path), str(tmp_path))
+
+    assert list(result.daily_summaries) == [f'{TM}1日', f'{TM}2日']
+    (_, split), = intermediate.load_sheets(str(tmp_path / (pipeline.SPLIT_NAME + '.parquet'))).items()
+    assert split['日期'].tolist() == [1] * 4 + [2] * 4
+
+
+def test_day_cache_reused_when_only_month_changes(tmp_path):
+    # 同一份月报在不同月份下处理（如跨月后才上传），各天复用缓存，结果中的日期为本次的月份
+    day_cache = DayCache(cache_dir=str(tmp_path))
+    for month, reused in [('2026-09', 0), ('2026-10', 2), (None, 2)]:
+        days = pipeline._split_days(split_stage.normalize(_matrix(), TM, month))
+        parts, reused_days = pipeline._run_days(days, TM, True, 1, None, day_cache, StageMetrics())
+        assert reused_days == reused
+        expected = pipeline.process_days(pd.concat(days, ignore_index=True), TM, keep_intermediates=True)
+        for name in pipeline.DAY_STAGE_NAMES:
+            merged = pipeline._concat_frames([stages[name] for stages, _ in parts])
+            pd.testing.assert_frame_equal(merged, expected[0][name])
+        assert [sheet for _, summaries in parts for sheet in summaries] == list(expected[1])
@@ -0,0 +1,78 @@
+"""多个进程（各自的缓存实例和锁）同时写入、淘汰同一缓存目录"""
+import os
+import shutil
+
+import pandas as pd
+
+from modules import result_cache
+from modules.result_cache import DayCache, ResultCache
+
+
+def _day_result():
+    stages = {'全班次处理后的打卡数据': pd.DataFrame({'姓名': ['张三'], '打卡状态': ['正常']})}
+    daily_summaries = {'上下班打卡_月报_1日': pd.DataFrame({'姓名': ['张三'], '正常': [1]})}
+    return stages, daily_summaries
+
+
+def test_put_day_when_other_writer_finished_first(tmp_path, monkeypatch):
+    # 两个实例的锁互不相干（如API服务和Streamlit应用），B写入临时目录的过程中A写完了同一天
+    cache_a = DayCache(str(tmp_path))
+    cache_b = DayCache(str(tmp_path))
+    save_sheets = result_cache.intermediate.save_sheets
+    calls = []
+
+    def save_and_let_other_writer_finish(path, sheets):
+        save_sheets(path, sheets)
+        if not calls:
+            calls.append(path)
+            monkeypatch.setattr(result_cache.intermediate, 'save_sheets', save_sheets)
+            cache_a.put_day('fp', '1.0', *_day_result())
+
+    monkeypatch.setattr(result_cache.intermediate, 'save_sheets', save_and_let_other_writer_finish)
+    cache_b.put_day('fp', '1.0', *_day_result())
+
+    assert os.listdir(tmp_path) == ['fp-1.0']
+    stages, daily_summaries = cache_b.get_day('fp', '1.0')
+    pd.testing.assert_frame_equal(stages['全班次处理后的打卡数据'], _day_result()[0]['全班次处理后的打卡数据'])
+    assert list(daily_summaries) == ['上下班打卡_月报_1日']
+
+
+def test_evict_skips_entries_removed_by_other_writer(tmp_path, monkeypatch):
+    cache = ResultCache(str(tmp_path), max_bytes=0)
+    for name in ['a', 'b', 'c']:
+        os.makedirs(tmp_path / name)
+        (tmp_path / name / 'result.xlsx').write_bytes(b'x' * 10)
+    # 列出 b 的文件之后、读取文件信息之前，b 被其他进程淘汰
+    listdir = os.listdir
+
+    def listdir_then_evict(path):
+        names = listdir(path)
+        if os.path.basename(path) == 'b':
+            shutil.rmtree(path)
+        return names
+
+    monkeypatch.setattr(result_cache.os, 'listdir', listdir_then_evict)
+    cache._evict(keep=str(tmp_path / 'c'))
+    assert listdir(tmp_path) == ['c']
+
+
+def test_evict_ignores_files_being_written(tmp_path):
+    cache = ResultCache(str(tmp_path), max_bytes=0)
+    tmp_dir = tmp_path / f"entry{result_cache.TMP_SUFFIX}"
+    os.makedirs(tmp_dir)
+    (tmp_dir / 'result.xlsx').write_bytes(b'x' * 10)
+    cache._evict()
+    assert tmp_dir.exists()
+
+
+def test_evict_reports_removed_entries(tmp_path):
+    # 调用方据此删除仍指向被淘汰文件的引用（API服务中可下载的文件ID）
+    evicted = []
+    cache = ResultCache(str(tmp_path / 'cache'), max_bytes=15, on_evict=evicted.append)
+    for name in ['old', 'new']:
+        source = tmp_path / f'{name}.xlsx'
+        source.write_bytes(b'x' * 10)
+        cached_path = cache.put(name, '1.0', str(source))
+    assert evicted == [cache._entry_dir('old', '1.0')]
+    assert not os.path.exists(evicted[0])
+    assert cache.get('new', '1.0') == cached_path
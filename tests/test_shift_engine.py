@@ -0,0 +1,77 @@
+"""班次规则：决策表的结果与 4全班.py 逐行处理的结果完全一致"""
+import copy
+import importlib
+
+import pandas as pd
+import pytest
+
+from modules import schema, shift_engine
+
+full_shift = importlib.import_module('modules.4全班')
+
+EMPLOYEE = ['张三', 'kq_001']
+# 缺卡及无法识别的打卡
+INVALID_PUNCHES = [None, float('nan'), '', ' ', '请假', '25:00', '08:60', 'abc', '08:00:00', '次日06:30', ' 凌晨01:30']
+
+
+def _hhmm(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def _minute_rows(shift):
+    """每一分钟分别作为上班卡、下班卡、中午（傍晚）打卡及全部四次打卡"""
+    rows = []
+    for minutes in range(1440):
+        t = _hhmm(minutes)
+        for punches in ([t, None, None, None], [None, t, None, None], [None, None, None, t],
+                        [t, t, t, t], ['08:00', t, '12:40', '17:30'], ['13:30', '17:40', t, '22:00']):
+            rows.append(EMPLOYEE + ['生产部', shift] + punches)
+    return rows
+
+
+def _invalid_rows():
+    """缺卡、无法识别的打卡，后勤部及未知班次"""
+    rows = []
+    for department, shift in [('生产部', '早班'), ('生产部', '中班'), ('生产部', '晚班'),
+                              ('后勤部', '早班'), ('后勤部', None), ('生产部', '白班'), ('生产部', None)]:
+        for punch in INVALID_PUNCHES:
+            for punches in ([punch] * 4, [punch, '12:00', '13:00', punch], ['08:00', punch, punch, '17:30'],
+                            ['18:00', punch, None, None]):
+                rows.append(EMPLOYEE + [department, shift] + punches)
+    return rows
+
+
+def _frame(rows):
+    return pd.DataFrame(rows, columns=['姓名', '员工ID', '部门', '班次'] + shift_engine.PUNCH_COLS)
+
+
+def _assert_same_results(df):
+    # 分类类型的打卡列（流水线中的长表）与字符串打卡列的结果相同
+    vectorized = full_shift.process_sheet(df.copy())
+    categorical = full_shift.process_sheet(df.astype({col: 'category' for col in shift_engine.PUNCH_COLS}))
+    by_row = full_shift.process_sheet_by_row(df.copy())
+    for col in shift_engine.DURATION_COLS:
+        assert vectorized[col].dtype == categorical[col].dtype == by_row[col].dtype == schema.DURATION_DTYPE
+    for col in shift_engine.RESULT_COLS:
+        expected = by_row[col].astype(object).tolist()
+        for result in (vectorized, categorical):
+            actual = result[col].astype(object).tolist()
+            mismatches = [(i, a, e) for i, (a, e) in enumerate(zip(actual, expected))
+                          if not (pd.isna(a) and pd.isna(e)) and (a != e or type(a) is not type(e))]
+            assert not mismatches, (col, df.iloc[mismatches[0][0]].tolist(), mismatches[:5])
+
+
+@pytest.mark.parametrize('shift', ['早班', '中班', '晚班'])
+def test_every_minute_matches_row_rules(shift):
+    _assert_same_results(_frame(_minute_rows(shift)))
+
+
+def test_missing_and_invalid_punches_match_row_rules():
+    _assert_same_results(_frame(_invalid_rows()))
+
+
+def test_rule_version_follows_shift_rules():
+    rules = copy.deepcopy(shift_engine.SHIFT_RULES)
+    assert shift_engine.rule_version(rules) == shift_engine.RULE_VERSION
+    rules['早班']['work_start'] = '08:30'
+    assert shift_engine.rule_version(rules) != shift_engine.RULE_VERSION
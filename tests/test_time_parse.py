@@ -0,0 +1,75 @@
+"""time_parse 的查表解析与原脚本 datetime.strptime 解析的结果一致"""
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules import time_parse
+
+CASES = ['8:05', '08:05', '08:5', ' 08:05 ', '00:00', '23:59', '24:00', '12:60', '次日06:30', '凌晨01:30',
+         '次日 06:30', ' 凌晨01:30 ', '次日凌晨01:30', '请假', '', '   ', '8点05', '08:05:00', '０８:０５',
+         np.nan, None, pd.NA, 805]
+
+
+def strptime_minutes(time_obj):
+    return time_parse.MISSING if time_obj is None else time_obj.hour * 60 + time_obj.minute
+
+
+def old_hhmm(text):
+    """原脚本（2时间预处理、3分列时间）的解析：datetime.strptime(t, '%H:%M')"""
+    try:
+        return strptime_minutes(datetime.strptime(text, '%H:%M'))
+    except (TypeError, ValueError):
+        return time_parse.MISSING
+
+
+def old_punch(time_str):
+    """原 4全班.parse_time"""
+    if pd.isna(time_str) or str(time_str).strip() == "":
+        return time_parse.MISSING
+    try:
+        cleaned = str(time_str).strip().replace("次日", "").replace("凌晨", "").strip()
+        return strptime_minutes(datetime.strptime(cleaned, "%H:%M").time())
+    except ValueError:
+        return time_parse.MISSING
+
+
+@pytest.mark.parametrize('value', CASES)
+def test_parse_hhmm_matches_strptime(value):
+    assert time_parse.parse_hhmm(value) == old_hhmm(value)
+
+
+@pytest.mark.parametrize('value', CASES)
+def test_parse_punch_matches_parse_time(value):
+    assert time_parse.parse_punch(value) == old_punch(value)
+
+
+def test_every_minute_matches_strptime():
+    for minutes in range(24 * 60):
+        hour, minute = divmod(minutes, 60)
+        for text in (f"{hour:02d}:{minute:02d}", f"{hour}:{minute}", f"次日{hour:02d}:{minute:02d}"):
+            assert time_parse.parse_punch(text) == old_punch(text) == minutes
+
+
+def test_known_values():
+    assert time_parse.parse_hhmm('8:05') == 485
+    assert time_parse.parse_punch(' 08:05 ') == 485
+    assert time_parse.parse_hhmm(' 08:05 ') == time_parse.MISSING
+    assert time_parse.parse_punch('次日06:30') == 390
+    assert time_parse.parse_punch('凌晨01:30') == 90
+    for value in ('24:00', '请假', '', np.nan):
+        assert time_parse.parse_punch(value) == time_parse.MISSING
+
+
+@pytest.mark.parametrize('parse, old', [(time_parse.parse_punch, old_punch), (time_parse.parse_hhmm, old_hhmm)])
+def test_parse_series_matches_elementwise(parse, old):
+    values = pd.Series(CASES * 3, dtype=object)
+    result = time_parse.parse_series(values, parse)
+    assert result.dtype == np.int32
+    assert result.tolist() == [old(v) for v in values]
+
+
+def test_parse_series_categorical():
+    values = pd.Series(['08:05', None, '次日06:30', '08:05', '请假'], dtype='category')
+    assert time_parse.parse_series(values).tolist() == [485, time_parse.MISSING, 390, 485, time_parse.MISSING]
@@ -0,0 +1,47 @@
+"""上传文件的流式保存：请求体按任意大小分块到达时，保存的文件与上传的内容相同"""
+import hashlib
+
+import pytest
+
+from modules.uploads import MultipartFileWriter, UploadError
+
+CONTENT_TYPE = 'multipart/form-data; boundary=kqxt'
+
+
+def _body(content, filename='上下班打卡_月报.xlsx'):
+    return (b'--kqxt\r\nContent-Disposition: form-data; name="format"\r\n\r\nxlsx\r\n'
+            b'--kqxt\r\nContent-Disposition: form-data; name="file"; filename="' + filename.encode('utf-8') + b'"\r\n'
+            b'Content-Type: application/octet-stream\r\n\r\n' + content + b'\r\n--kqxt--\r\n')
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 1024 * 1024])
+def test_file_part_is_written_as_uploaded(tmp_path, chunk_size):
+    content = bytes(range(256)) * 50 + b'\r\n--kqx'
+    body = _body(content)
+    writer = MultipartFileWriter(CONTENT_TYPE, str(tmp_path / 'id'))
+    for start in range(0, len(body), chunk_size):
+        writer.write(body[start:start + chunk_size])
+    writer.finish()
+    assert writer.filename == '上下班打卡_月报.xlsx'
+    assert writer.path == str(tmp_path / 'id_上下班打卡_月报.xlsx')
+    assert open(writer.path, 'rb').read() == content
+    assert (writer.size, writer.sha256) == (len(content), hashlib.sha256(content).hexdigest())
+
+
+def test_missing_file_field(tmp_path):
+    writer = MultipartFileWriter(CONTENT_TYPE, str(tmp_path / 'id'))
+    writer.write(b'--kqxt\r\nContent-Disposition: form-data; name="format"\r\n\r\nxlsx\r\n--kqxt--\r\n')
+    with pytest.raises(UploadError):
+        writer.finish()
+
+
+def test_discard_removes_partial_file(tmp_path):
+    writer = MultipartFileWriter(CONTENT_TYPE, str(tmp_path / 'id'))
+    writer.write(_body(b'x' * 100)[:200])
+    writer.discard()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_rejects_other_content_types(tmp_path):
+    with pytest.raises(UploadError):
+        MultipartFileWriter('application/json', str(tmp_path / 'id'))
@@ -0,0 +1,68 @@
+"""常驻工作进程池：多个任务并发执行时替换进程池不影响已开始的任务"""
+import threading
+
+from modules.worker_pool import WorkerPool
+
+
+class _RunAfterFirstRelease:
+    """包装进程池的锁：第一次释放锁之后先执行 hook，再回到原来的线程继续执行"""
+
+    def __init__(self, lock, hook):
+        self._lock = lock
+        self._hook = hook
+
+    def __enter__(self):
+        self._lock.acquire()
+
+    def __exit__(self, *exc_info):
+        self._lock.release()
+        hook, self._hook = self._hook, None
+        if hook is not None:
+            hook()
+
+
+def test_recycle_between_concurrent_maps():
+    # 每个任务之后都替换进程池；第一个任务取得进程池后，另一个线程的任务先完成并替换了进程池
+    pool = WorkerPool(workers=1, max_jobs=1).start()
+    other_results = []
+
+    def run_other_job():
+        thread = threading.Thread(target=lambda: other_results.append(pool.map(pow, [3], [2])))
+        thread.start()
+        thread.join()
+
+    pool._lock = _RunAfterFirstRelease(pool._lock, run_other_job)
+    try:
+        assert pool.map(pow, [2, 4, 5], [2, 2, 2]) == [4, 16, 25]
+    finally:
+        pool.shutdown()
+    assert other_results == [[9]]
+    assert pool.recycled >= 1
+
+
+def test_concurrent_maps_with_recycling():
+    pool = WorkerPool(workers=1, max_jobs=1).start()
+    errors = []
+    results = []
+
+    def run(thread_id):
+        try:
+            for _ in range(5):
+                bases = list(range(thread_id, thread_id + 20))
+                results.append((pool.map(pow, bases, [2] * len(bases)), bases))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(thread_id,)) for thread_id in range(4)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        pool.shutdown()
+
+    assert errors == []
+    assert len(results) == 4 * 5
+    for result, bases in results:
+        assert result == [base ** 2 for base in bases]